@@ -31,6 +31,72 @@ BEGIN
     END IF;
 END $$;
 
+-- Soft delete de registros removidos no VetCare (reconciliação do db_import.py)
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP;
+ALTER TABLE pets ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP;
+ALTER TABLE vaccines ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP;
+ALTER TABLE grooming_services ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP;
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP;
+
+-- Agregados do dashboard (mantidos por scripts/dashboard_rollup.py)
+CREATE TABLE IF NOT EXISTS dashboard_daily_messages (
+  day DATE NOT NULL,
+  reactivation_type VARCHAR(20) NOT NULL,
+  status VARCHAR(10) NOT NULL,
+  total INTEGER NOT NULL,
+  PRIMARY KEY (day, reactivation_type, status)
+);
+
+CREATE TABLE IF NOT EXISTS dashboard_daily_customers (
+  day DATE NOT NULL,
+  customer_id INTEGER NOT NULL,
+  total INTEGER NOT NULL,
+  success INTEGER NOT NULL,
+  last_sent_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (day, customer_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_daily_customers_customer_id
+  ON dashboard_daily_customers(customer_id);
+
+CREATE TABLE IF NOT EXISTS dashboard_customer_totals (
+  customer_id INTEGER PRIMARY KEY,
+  total_messages INTEGER NOT NULL,
+  success_messages INTEGER NOT NULL,
+  last_message TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_customer_totals_total
+  ON dashboard_customer_totals(total_messages DESC);
+
+CREATE TABLE IF NOT EXISTS dashboard_rollup_state (
+  name VARCHAR(50) PRIMARY KEY,
+  watermark TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Change feed do importador (scripts/db_import.py e scripts/change_feed.py)
+CREATE TABLE IF NOT EXISTS import_batches (
+  id BIGSERIAL PRIMARY KEY,
+  started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished_at TIMESTAMP,
+  changes JSONB,
+  error TEXT  -- preenchido quando a importação foi interrompida
+);
+
+CREATE TABLE IF NOT EXISTS import_change_log (
+  batch_id BIGINT NOT NULL REFERENCES import_batches(id) ON DELETE CASCADE,
+  entity VARCHAR(20) NOT NULL,
+  entity_id INTEGER NOT NULL,
+  pet_id INTEGER,
+  operation CHAR(1) NOT NULL,  -- I = inserido, U = alterado, D = removido na origem
+  PRIMARY KEY (batch_id, entity, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_change_log_pet_id ON import_change_log(pet_id);
+
+ALTER TABLE import_batches ADD COLUMN IF NOT EXISTS error TEXT;
+
 -- Create indexes for new columns
 CREATE INDEX IF NOT EXISTS idx_customers_cpf ON customers(cpf);
 CREATE INDEX IF NOT EXISTS idx_customers_city ON customers(city);
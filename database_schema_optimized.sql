@@ -32,7 +32,8 @@ CREATE TABLE IF NOT EXISTS customers (
   saldo_devedor NUMERIC(10, 2) DEFAULT 0,
   ativo BOOLEAN DEFAULT TRUE,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  removed_upstream_at TIMESTAMP  -- Removido no VetCare (reconciliação do db_import.py)
 );
 
 CREATE INDEX idx_customers_phone ON customers(phone);
@@ -61,6 +62,7 @@ CREATE TABLE IF NOT EXISTS pets (
   ativo BOOLEAN DEFAULT TRUE,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  removed_upstream_at TIMESTAMP,  -- Removido no VetCare (reconciliação do db_import.py)
   FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
 );
 
@@ -86,6 +88,7 @@ CREATE TABLE IF NOT EXISTS vaccines (
   observacoes TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  removed_upstream_at TIMESTAMP,  -- Removido no VetCare (reconciliação do db_import.py)
   FOREIGN KEY (pet_id) REFERENCES pets(id) ON DELETE CASCADE,
   UNIQUE (pet_id, vaccine_name, application_date)  -- Evita duplicatas
 );
@@ -117,6 +120,7 @@ CREATE TABLE IF NOT EXISTS grooming_services (
   observacoes TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  removed_upstream_at TIMESTAMP,  -- Removido no VetCare (reconciliação do db_import.py)
   FOREIGN KEY (pet_id) REFERENCES pets(id) ON DELETE CASCADE,
   UNIQUE (pet_id, service_date)  -- Evita duplicatas
 );
@@ -170,6 +174,7 @@ CREATE TABLE IF NOT EXISTS appointments (
   motivo_cancelamento TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  removed_upstream_at TIMESTAMP,  -- Removido no VetCare (reconciliação do db_import.py)
   FOREIGN KEY (pet_id) REFERENCES pets(id) ON DELETE CASCADE,
   FOREIGN KEY (cliente_id) REFERENCES customers(id) ON DELETE CASCADE
 );
@@ -259,8 +264,11 @@ CREATE INDEX idx_completed_services_satisfaction_sent ON completed_services(sati
 CREATE TYPE reactivation_type AS ENUM ('vaccine', 'financial', 'grooming', 'appointment', 'satisfaction');
 CREATE TYPE reactivation_status AS ENUM ('success', 'error');
 
+-- Particionada por mês em sent_at. As partições mensais são criadas por
+-- `python scripts/db_cleanup.py partition ensure`; a partição default
+-- recebe qualquer linha fora dos meses já criados.
 CREATE TABLE IF NOT EXISTS reactivation_logs (
-  id SERIAL PRIMARY KEY,
+  id SERIAL,
   customer_id INTEGER NOT NULL,
   reactivation_type reactivation_type NOT NULL,
   message_sent JSONB NOT NULL,
@@ -268,14 +276,82 @@ CREATE TABLE IF NOT EXISTS reactivation_logs (
   status reactivation_status NOT NULL,
   error_message TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id, sent_at),
   FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (sent_at);
+
+CREATE TABLE IF NOT EXISTS reactivation_logs_default PARTITION OF reactivation_logs DEFAULT;
 
 CREATE INDEX idx_reactivation_logs_customer_id ON reactivation_logs(customer_id);
 CREATE INDEX idx_reactivation_logs_reactivation_type ON reactivation_logs(reactivation_type);
 CREATE INDEX idx_reactivation_logs_sent_at ON reactivation_logs(sent_at);
 CREATE INDEX idx_reactivation_logs_status ON reactivation_logs(status);
 
+-- =========================================================================
+-- TABELAS: dashboard_* (Agregados do dashboard)
+-- =========================================================================
+-- Mantidas por `python scripts/dashboard_rollup.py` a partir de
+-- reactivation_logs; a rota /dashboard lê daqui.
+CREATE TABLE IF NOT EXISTS dashboard_daily_messages (
+  day DATE NOT NULL,
+  reactivation_type VARCHAR(20) NOT NULL,
+  status VARCHAR(10) NOT NULL,
+  total INTEGER NOT NULL,
+  PRIMARY KEY (day, reactivation_type, status)
+);
+
+CREATE TABLE IF NOT EXISTS dashboard_daily_customers (
+  day DATE NOT NULL,
+  customer_id INTEGER NOT NULL,
+  total INTEGER NOT NULL,
+  success INTEGER NOT NULL,
+  last_sent_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (day, customer_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_daily_customers_customer_id
+  ON dashboard_daily_customers(customer_id);
+
+CREATE TABLE IF NOT EXISTS dashboard_customer_totals (
+  customer_id INTEGER PRIMARY KEY,
+  total_messages INTEGER NOT NULL,
+  success_messages INTEGER NOT NULL,
+  last_message TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_customer_totals_total
+  ON dashboard_customer_totals(total_messages DESC);
+
+CREATE TABLE IF NOT EXISTS dashboard_rollup_state (
+  name VARCHAR(50) PRIMARY KEY,
+  watermark TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =========================================================================
+-- TABELAS: import_batches / import_change_log (Change feed do importador)
+-- =========================================================================
+-- Um lote por execução do `scripts/db_import.py`; o change log guarda os ids
+-- que realmente mudaram. Lidas por `scripts/change_feed.py`.
+CREATE TABLE IF NOT EXISTS import_batches (
+  id BIGSERIAL PRIMARY KEY,
+  started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished_at TIMESTAMP,
+  changes JSONB,
+  error TEXT  -- preenchido quando a importação foi interrompida
+);
+
+CREATE TABLE IF NOT EXISTS import_change_log (
+  batch_id BIGINT NOT NULL REFERENCES import_batches(id) ON DELETE CASCADE,
+  entity VARCHAR(20) NOT NULL,
+  entity_id INTEGER NOT NULL,
+  pet_id INTEGER,
+  operation CHAR(1) NOT NULL,  -- I = inserido, U = alterado, D = removido na origem
+  PRIMARY KEY (batch_id, entity, entity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_change_log_pet_id ON import_change_log(pet_id);
+
 -- =========================================================================
 -- TRIGGERS: Auto-update de updated_at
 -- =========================================================================
@@ -367,6 +443,10 @@ COMMENT ON TABLE medical_history IS 'Histórico médico completo (consultas, ana
 COMMENT ON TABLE weight_history IS 'Histórico de evolução de peso';
 COMMENT ON TABLE completed_services IS 'Serviços concluídos para pesquisa de satisfação';
 COMMENT ON TABLE reactivation_logs IS 'Log de todas as reativações enviadas';
+COMMENT ON TABLE dashboard_daily_messages IS 'Mensagens por dia, tipo e status (rollup do dashboard)';
+COMMENT ON TABLE dashboard_customer_totals IS 'Totais de mensagens por cliente (rollup do dashboard)';
+COMMENT ON TABLE import_batches IS 'Lotes de importação do VetCare (change feed)';
+COMMENT ON TABLE import_change_log IS 'Registros alterados em cada lote de importação';
 
 -- =========================================================================
 -- DADOS INICIAIS: Planos de Banho
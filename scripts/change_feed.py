@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Change Feed Consumer
+Inspeciona, escuta e reemite o change feed gravado pelo db_import.py
+"""
+
+import sys
+import json
+import select
+from datetime import datetime
+
+from db_cleanup import (
+    DB_CONFIG, Colors, get_connection, get_option,
+    print_header, print_success, print_warning, print_error, print_info,
+)
+from db_import import CHANGE_FEED_CHANNEL
+
+def list_batches(conn, limit):
+    """Lista os últimos lotes de importação com a contagem de alterações"""
+    print_header("LOTES DE IMPORTAÇÃO")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, started_at, finished_at, changes, error
+        FROM import_batches
+        ORDER BY id DESC
+        LIMIT %s
+    """, (limit,))
+
+    for batch_id, started_at, finished_at, changes, error in cursor.fetchall():
+        if not finished_at:
+            status = f"{Colors.WARNING}incompleto{Colors.ENDC}"
+        elif error:
+            status = f"{finished_at:%H:%M:%S} {Colors.FAIL}falhou{Colors.ENDC}"
+        else:
+            status = f"{finished_at:%H:%M:%S}"
+        summary = ', '.join(f"{entity}: {count:,}" for entity, count in (changes or {}).items()) or 'sem alterações'
+        print(f"  #{batch_id:<6} {started_at:%Y-%m-%d %H:%M:%S} -> {status}  {summary}")
+
+    cursor.close()
+
+def show_batch(conn, batch_id, entity=None):
+    """Mostra as alterações de um lote"""
+    print_header(f"ALTERAÇÕES DO LOTE #{batch_id}")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT entity, entity_id, pet_id, operation
+        FROM import_change_log
+        WHERE batch_id = %s AND (%s::TEXT IS NULL OR entity = %s)
+        ORDER BY entity, entity_id
+    """, (batch_id, entity, entity))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    if not rows:
+        print_info("Nenhuma alteração registrada")
+        return
+
+    for entity_name, entity_id, pet_id, operation in rows:
+        label = {'I': 'inserido', 'U': 'alterado', 'D': 'removido na origem'}.get(operation, operation)
+        pet = f" (pet {pet_id})" if pet_id and entity_name != 'pets' else ''
+        print(f"  {entity_name:14} {entity_id:>8}{pet}  {label}")
+
+    print()
+    print_info(f"Total: {len(rows):,} alterações")
+
+def affected_pets(conn, since_batch, until_batch=None):
+    """
+    Pets que precisam ser reavaliados pelas reativações: alterados diretamente
+    ou pertencentes a clientes alterados nos lotes informados.
+    """
+    cursor = conn.cursor()
+    params = {'since': since_batch, 'until': until_batch}
+    cursor.execute("""
+        SELECT pet_id FROM import_change_log
+        WHERE batch_id > %(since)s AND (%(until)s::BIGINT IS NULL OR batch_id <= %(until)s)
+          AND pet_id IS NOT NULL
+        UNION
+        SELECT p.id FROM import_change_log l
+        JOIN pets p ON p.customer_id = l.entity_id
+        WHERE l.batch_id > %(since)s AND (%(until)s::BIGINT IS NULL OR l.batch_id <= %(until)s)
+          AND l.entity = 'customers'
+        ORDER BY 1
+    """, params)
+    pet_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return pet_ids
+
+def replay(conn, since_batch, until_batch=None):
+    """
+    Reemite o pg_notify dos lotes para que os consumidores reprocessem.
+    Lotes nunca fechados (processo morto no meio) usam as contagens do change log.
+    """
+    print_header("REPLAY DO CHANGE FEED")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, changes, finished_at IS NULL FROM (
+            SELECT b.id, b.finished_at, COALESCE(b.changes, (
+                SELECT jsonb_object_agg(entity, total) FROM (
+                    SELECT entity, COUNT(*) AS total FROM import_change_log
+                    WHERE batch_id = b.id GROUP BY entity
+                ) counts
+            )) AS changes
+            FROM import_batches b
+            WHERE b.id > %s AND (%s::BIGINT IS NULL OR b.id <= %s)
+        ) batches
+        WHERE changes IS NOT NULL AND changes <> '{}'::JSONB
+        ORDER BY id
+    """, (since_batch, until_batch, until_batch))
+    batches = cursor.fetchall()
+
+    for batch_id, changes, incomplete in batches:
+        message = {'batch_id': batch_id, 'changes': changes, 'replay': True}
+        if incomplete:
+            message['incomplete'] = True
+        payload = json.dumps(message)
+        cursor.execute("SELECT pg_notify(%s, %s)", (CHANGE_FEED_CHANNEL, payload))
+        print_success(f"Lote #{batch_id} reemitido")
+
+    conn.commit()
+    cursor.close()
+
+    if not batches:
+        print_info("Nenhum lote com alterações no intervalo")
+
+def listen(conn):
+    """Escuta o canal do change feed e imprime cada lote recebido"""
+    print_header("ESCUTANDO CHANGE FEED")
+
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(f"LISTEN {CHANGE_FEED_CHANNEL}")
+    print_info(f"Aguardando notificações em '{CHANGE_FEED_CHANNEL}' (Ctrl+C para sair)")
+
+    try:
+        while True:
+            if select.select([conn], [], [], 60) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                payload = json.loads(notify.payload)
+                summary = ', '.join(f"{entity}: {count:,}" for entity, count in payload['changes'].items())
+                replayed = ' (replay)' if payload.get('replay') else ''
+                replayed += ' (falhou)' if payload.get('failed') else ''
+                print_success(f"{datetime.now():%H:%M:%S} lote #{payload['batch_id']}{replayed}: {summary}")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        cursor.close()
+
+def prune(conn, keep_days):
+    """Remove lotes (e suas alterações) mais antigos que `keep_days`"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        DELETE FROM import_batches WHERE started_at < NOW() - (%s || ' days')::INTERVAL
+    """, (str(keep_days),))
+    deleted = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    print_success(f"{deleted:,} lotes com mais de {keep_days} dias removidos")
+
+def main():
+    """Função principal"""
+    print_header("CHANGE FEED")
+    print_info(f"Database: {DB_CONFIG['database']} @ {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    print()
+
+    if len(sys.argv) < 2:
+        print(f"{Colors.BOLD}Uso:{Colors.ENDC}")
+        print(f"  python {sys.argv[0]} <comando> [opções]")
+        print()
+        print(f"{Colors.BOLD}Comandos disponíveis:{Colors.ENDC}")
+        print(f"  batches            - Lista os últimos lotes [--limit=20]")
+        print(f"  show <lote>        - Alterações de um lote [--entity=vaccines]")
+        print(f"  pets               - Pets afetados --since=<lote> [--until=<lote>]")
+        print(f"  listen             - Escuta o canal '{CHANGE_FEED_CHANNEL}'")
+        print(f"  replay             - Reemite notificações --since=<lote> [--until=<lote>]")
+        print(f"  prune              - Remove lotes antigos [--keep-days=30]")
+        print()
+        sys.exit(1)
+
+    command = sys.argv[1]
+    conn = get_connection()
+
+    try:
+        if command == 'batches':
+            list_batches(conn, int(get_option('limit', '20')))
+
+        elif command == 'show':
+            if len(sys.argv) < 3 or not sys.argv[2].isdigit():
+                print_error("Informe o número do lote: show <lote>")
+                sys.exit(1)
+            show_batch(conn, int(sys.argv[2]), get_option('entity'))
+
+        elif command == 'pets':
+            until = get_option('until')
+            pet_ids = affected_pets(conn, int(get_option('since', '0')), int(until) if until else None)
+            print('\n'.join(str(pet_id) for pet_id in pet_ids))
+            print_info(f"{len(pet_ids):,} pets afetados")
+
+        elif command == 'listen':
+            listen(conn)
+
+        elif command == 'replay':
+            if get_option('since') is None:
+                print_warning("Sem --since: reemitindo todos os lotes")
+            until = get_option('until')
+            replay(conn, int(get_option('since', '0')), int(until) if until else None)
+
+        elif command == 'prune':
+            prune(conn, int(get_option('keep-days', '30')))
+
+        else:
+            print_error(f"Comando desconhecido: {command}")
+            sys.exit(1)
+
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
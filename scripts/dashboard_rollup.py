@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Dashboard Rollup Job
+Mantém tabelas de agregados diários de reactivation_logs para o dashboard
+"""
+
+import sys
+import time
+from datetime import timedelta
+
+from db_cleanup import (
+    DB_CONFIG, Colors, get_connection, get_option, ensure_future_partitions,
+    print_header, print_success, print_warning, print_error, print_info,
+)
+
+# Lock consultivo para impedir duas execuções simultâneas
+ROLLUP_LOCK_ID = 7301
+
+# Mesmas tabelas do database_schema_optimized.sql (para bancos criados antes delas)
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dashboard_daily_messages (
+      day DATE NOT NULL,
+      reactivation_type VARCHAR(20) NOT NULL,
+      status VARCHAR(10) NOT NULL,
+      total INTEGER NOT NULL,
+      PRIMARY KEY (day, reactivation_type, status)
+    );
+
+    CREATE TABLE IF NOT EXISTS dashboard_daily_customers (
+      day DATE NOT NULL,
+      customer_id INTEGER NOT NULL,
+      total INTEGER NOT NULL,
+      success INTEGER NOT NULL,
+      last_sent_at TIMESTAMP NOT NULL,
+      PRIMARY KEY (day, customer_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_dashboard_daily_customers_customer_id
+      ON dashboard_daily_customers(customer_id);
+
+    CREATE TABLE IF NOT EXISTS dashboard_customer_totals (
+      customer_id INTEGER PRIMARY KEY,
+      total_messages INTEGER NOT NULL,
+      success_messages INTEGER NOT NULL,
+      last_message TIMESTAMP NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_dashboard_customer_totals_total
+      ON dashboard_customer_totals(total_messages DESC);
+
+    CREATE TABLE IF NOT EXISTS dashboard_rollup_state (
+      name VARCHAR(50) PRIMARY KEY,
+      watermark TIMESTAMP,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+def ensure_rollup_tables(cursor):
+    cursor.execute(ROLLUP_SCHEMA)
+
+def get_watermark(cursor):
+    """Maior sent_at já agregado (bloqueia a linha até o fim da transação)"""
+    cursor.execute("""
+        INSERT INTO dashboard_rollup_state (name, watermark) VALUES ('reactivation_logs', NULL)
+        ON CONFLICT (name) DO NOTHING
+    """)
+    cursor.execute("SELECT watermark FROM dashboard_rollup_state WHERE name = 'reactivation_logs' FOR UPDATE")
+    return cursor.fetchone()[0]
+
+def set_watermark(cursor, watermark):
+    cursor.execute("""
+        UPDATE dashboard_rollup_state SET watermark = %s, updated_at = NOW()
+        WHERE name = 'reactivation_logs'
+    """, (watermark,))
+
+def rollup_range(cursor, start_day, end_day=None):
+    """
+    Recalcula os agregados dos dias em [start_day, end_day) a partir dos logs.
+    O recálculo por dia inteiro torna a operação idempotente.
+    Retorna o número de linhas de log lidas.
+    """
+    bounds = "sent_at >= %(start)s" + (" AND sent_at < %(end)s" if end_day else "")
+    day_bounds = "day >= %(start)s" + (" AND day < %(end)s" if end_day else "")
+    params = {'start': start_day, 'end': end_day}
+
+    cursor.execute(f"DELETE FROM dashboard_daily_messages WHERE {day_bounds}", params)
+    cursor.execute(f"""
+        INSERT INTO dashboard_daily_messages (day, reactivation_type, status, total)
+        SELECT DATE(sent_at), reactivation_type::TEXT, status::TEXT, COUNT(*)
+        FROM reactivation_logs
+        WHERE {bounds}
+        GROUP BY 1, 2, 3
+    """, params)
+
+    cursor.execute(f"DELETE FROM dashboard_daily_customers WHERE {day_bounds}", params)
+    cursor.execute(f"""
+        INSERT INTO dashboard_daily_customers (day, customer_id, total, success, last_sent_at)
+        SELECT DATE(sent_at), customer_id, COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'success'), MAX(sent_at)
+        FROM reactivation_logs
+        WHERE {bounds}
+        GROUP BY 1, 2
+    """, params)
+
+    cursor.execute(f"SELECT COALESCE(SUM(total), 0) FROM dashboard_daily_messages WHERE {day_bounds}", params)
+    return cursor.fetchone()[0]
+
+def refresh_customer_totals(cursor, start_day=None):
+    """
+    Recalcula o ranking dos clientes que tiveram mensagens a partir de start_day
+    e remove os clientes que não existem mais (ou não têm mais agregados diários)
+    """
+    if start_day is None:
+        cursor.execute("TRUNCATE dashboard_customer_totals")
+        affected = "TRUE"
+    else:
+        affected = """customer_id IN (
+            SELECT customer_id FROM dashboard_daily_customers WHERE day >= %(start)s
+        )"""
+        cursor.execute("""
+            DELETE FROM dashboard_customer_totals t
+            WHERE NOT EXISTS (SELECT 1 FROM customers c WHERE c.id = t.customer_id)
+               OR NOT EXISTS (SELECT 1 FROM dashboard_daily_customers d WHERE d.customer_id = t.customer_id)
+        """)
+
+    cursor.execute(f"""
+        INSERT INTO dashboard_customer_totals (customer_id, total_messages, success_messages, last_message)
+        SELECT customer_id, SUM(total), SUM(success), MAX(last_sent_at)
+        FROM dashboard_daily_customers
+        WHERE {affected}
+        GROUP BY customer_id
+        ON CONFLICT (customer_id) DO UPDATE SET
+            total_messages = EXCLUDED.total_messages,
+            success_messages = EXCLUDED.success_messages,
+            last_message = EXCLUDED.last_message
+    """, {'start': start_day})
+    return cursor.rowcount
+
+def acquire_lock(cursor):
+    cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (ROLLUP_LOCK_ID,))
+    if not cursor.fetchone()[0]:
+        print_warning("Outra execução do rollup está em andamento")
+        sys.exit(0)
+
+def run_incremental(conn, lookback_days=1):
+    """Atualiza os agregados a partir do watermark (menos `lookback_days` para logs atrasados)"""
+    print_header("ROLLUP INCREMENTAL")
+
+    # O cron do rollup também garante as partições dos próximos meses de reactivation_logs
+    ensure_future_partitions(conn)
+
+    cursor = conn.cursor()
+    start = time.time()
+
+    try:
+        acquire_lock(cursor)
+        ensure_rollup_tables(cursor)
+        watermark = get_watermark(cursor)
+
+        if watermark is None:
+            print_warning("Nenhum watermark - executando backfill completo")
+            conn.rollback()
+            cursor.close()
+            run_backfill(conn)
+            return
+
+        start_day = watermark.date() - timedelta(days=lookback_days)
+        print_info(f"Watermark: {watermark} - recalculando a partir de {start_day}")
+
+        rows = rollup_range(cursor, start_day)
+        customers = refresh_customer_totals(cursor, start_day)
+
+        cursor.execute("SELECT MAX(sent_at) FROM reactivation_logs WHERE sent_at >= %s", (start_day,))
+        new_watermark = cursor.fetchone()[0] or watermark
+        set_watermark(cursor, new_watermark)
+        conn.commit()
+
+        print_success(f"{rows:,} logs agregados, {customers:,} clientes atualizados")
+        print_success(f"Novo watermark: {new_watermark} ({time.time() - start:.2f}s)")
+
+    except Exception as e:
+        conn.rollback()
+        print_error(f"Erro no rollup: {e}")
+        sys.exit(1)
+    finally:
+        if not cursor.closed:
+            cursor.close()
+
+def run_backfill(conn):
+    """Reconstrói todos os agregados a partir do histórico completo, mês a mês"""
+    print_header("ROLLUP - BACKFILL COMPLETO")
+
+    cursor = conn.cursor()
+    start = time.time()
+
+    try:
+        acquire_lock(cursor)
+        ensure_rollup_tables(cursor)
+        get_watermark(cursor)
+
+        cursor.execute("SELECT MIN(sent_at), MAX(sent_at) FROM reactivation_logs")
+        min_sent, max_sent = cursor.fetchone()
+        if min_sent is None:
+            print_info("reactivation_logs está vazia")
+            conn.commit()
+            return
+
+        cursor.execute("TRUNCATE dashboard_daily_messages, dashboard_daily_customers")
+
+        month = min_sent.date().replace(day=1)
+        total_rows = 0
+        while month <= max_sent.date():
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            rows = rollup_range(cursor, month, next_month)
+            total_rows += rows
+            print_success(f"{month:%Y-%m}: {rows:,} logs agregados")
+            month = next_month
+
+        customers = refresh_customer_totals(cursor)
+        set_watermark(cursor, max_sent)
+        conn.commit()
+
+        print()
+        print_success(f"Backfill concluído: {total_rows:,} logs, {customers:,} clientes ({time.time() - start:.2f}s)")
+
+    except Exception as e:
+        conn.rollback()
+        print_error(f"Erro no backfill: {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+
+def show_status(conn):
+    """Mostra watermark e tamanho dos agregados"""
+    print_header("STATUS DO ROLLUP")
+
+    cursor = conn.cursor()
+    ensure_rollup_tables(cursor)
+    conn.commit()
+
+    cursor.execute("SELECT watermark, updated_at FROM dashboard_rollup_state WHERE name = 'reactivation_logs'")
+    row = cursor.fetchone()
+    if row and row[0]:
+        print_info(f"Watermark: {row[0]} (atualizado em {row[1]})")
+        cursor.execute("SELECT COUNT(*) FROM reactivation_logs WHERE sent_at > %s", (row[0],))
+        pending = cursor.fetchone()[0]
+        print_info(f"Logs pendentes: {pending:,}")
+    else:
+        print_warning("Rollup nunca executado - rode 'backfill'")
+
+    for table in ('dashboard_daily_messages', 'dashboard_daily_customers', 'dashboard_customer_totals'):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        print(f"  {table}: {cursor.fetchone()[0]:,} linhas")
+
+    cursor.close()
+
+def main():
+    """Função principal"""
+    print_header("DASHBOARD ROLLUP")
+    print_info(f"Database: {DB_CONFIG['database']} @ {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    print()
+
+    if len(sys.argv) < 2:
+        print(f"{Colors.BOLD}Uso:{Colors.ENDC}")
+        print(f"  python {sys.argv[0]} <comando> [opções]")
+        print()
+        print(f"{Colors.BOLD}Comandos disponíveis:{Colors.ENDC}")
+        print(f"  update             - Atualiza a partir do watermark [--lookback-days=1]")
+        print(f"  backfill           - Reconstrói todos os agregados")
+        print(f"  status             - Mostra watermark e tamanho dos agregados")
+        print()
+        sys.exit(1)
+
+    command = sys.argv[1]
+    conn = get_connection()
+
+    try:
+        if command == 'update':
+            run_incremental(conn, lookback_days=int(get_option('lookback-days', '1')))
+
+        elif command == 'backfill':
+            run_backfill(conn)
+
+        elif command == 'status':
+            show_status(conn)
+
+        else:
+            print_error(f"Comando desconhecido: {command}")
+            sys.exit(1)
+
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -5,10 +5,18 @@ Limpa completamente o banco de dados do Bot de Reativação Veterinária
 """
 
 import os
+import re
 import sys
+import glob
+import gzip
+import json
+import time
+import shutil
+import hashlib
 import psycopg2
 from psycopg2 import sql
-from datetime import datetime
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Adicionar diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,6 +30,23 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', ''),
 }
 
+# Cache HTTP do db_import.py (invalidado quando os dados são apagados)
+IMPORT_CACHE_PATH = os.getenv('IMPORT_CACHE_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.cache', 'http_cache.sqlite'
+))
+
+# Particionamento mensal de reactivation_logs
+PARTITIONED_TABLE = 'reactivation_logs'
+PARTITION_AHEAD_MONTHS = int(os.getenv('LOG_PARTITION_AHEAD_MONTHS', '3'))
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'archive'
+))
+
+# Snapshots rápidos (COPY por tabela, em paralelo)
+SNAPSHOT_DIR = os.getenv('DB_SNAPSHOT_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'snapshots'
+))
+
 # Cores para output
 class Colors:
     HEADER = '\033[95m'
@@ -51,6 +76,15 @@ def print_error(message):
 def print_info(message):
     print(f"{Colors.OKCYAN}ℹ {message}{Colors.ENDC}")
 
+def get_option(name, default=None):
+    """Lê opção da linha de comando no formato --nome=valor ou --nome valor"""
+    for i, arg in enumerate(sys.argv):
+        if arg.startswith(f'--{name}='):
+            return arg.split('=', 1)[1]
+        if arg == f'--{name}' and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return default
+
 def get_connection():
     """Conecta ao banco de dados PostgreSQL"""
     try:
@@ -61,6 +95,17 @@ def get_connection():
         print_error(f"Erro ao conectar ao banco: {e}")
         sys.exit(1)
 
+def invalidate_import_cache():
+    """
+    Remove o cache HTTP do importador (as respostas não refletem mais o banco),
+    incluindo os caches por clínica (http_cache.<clínica>.sqlite)
+    """
+    root, ext = os.path.splitext(IMPORT_CACHE_PATH)
+    for path in [IMPORT_CACHE_PATH] + glob.glob(f"{glob.escape(root)}.*{ext}"):
+        if os.path.exists(path):
+            os.remove(path)
+            print_info(f"Cache do importador removido: {path}")
+
 def get_table_counts(conn):
     """Retorna contagem de registros em cada tabela"""
     cursor = conn.cursor()
@@ -94,6 +139,12 @@ def drop_all_data(conn, confirm=True):
 
     # Ordem de deleção (respeitando FKs)
     tables_order = [
+        'import_change_log',
+        'import_batches',
+        'dashboard_rollup_state',
+        'dashboard_customer_totals',
+        'dashboard_daily_customers',
+        'dashboard_daily_messages',
         'reactivation_logs',
         'completed_services',
         'weight_history',
@@ -136,6 +187,10 @@ def drop_all_data(conn, confirm=True):
 
     try:
         for table in tables_order:
+            cursor.execute("SELECT to_regclass(%s)", (f'public.{table}',))
+            if not cursor.fetchone()[0]:
+                continue  # Tabela opcional ainda não criada
+
             cursor.execute(f"SELECT COUNT(*) FROM {table}")
             count = cursor.fetchone()[0]
 
@@ -151,7 +206,7 @@ def drop_all_data(conn, confirm=True):
         print_info("Resetando sequences...")
         cursor.execute("""
             SELECT sequence_name FROM information_schema.sequences
-            WHERE sequence_schema = 'public'
+            WHERE sequence_schema = current_schema()
         """)
         sequences = cursor.fetchall()
 
@@ -202,6 +257,12 @@ def recreate_schema(conn):
         print_info("Dropando tabelas existentes...")
 
         tables = [
+            'import_change_log',
+            'import_batches',
+            'dashboard_rollup_state',
+            'dashboard_customer_totals',
+            'dashboard_daily_customers',
+            'dashboard_daily_messages',
             'reactivation_logs',
             'completed_services',
             'weight_history',
@@ -253,13 +314,17 @@ def recreate_schema(conn):
 
         print_success("Schema otimizado criado com sucesso!")
 
+        print()
+        print_info("Criando partições mensais de reactivation_logs...")
+        ensure_partitions(conn)
+
         # Verificar tabelas criadas
         print()
         print_info("Verificando tabelas criadas:")
         cursor.execute("""
             SELECT table_name
             FROM information_schema.tables
-            WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+            WHERE table_schema = current_schema() AND table_type = 'BASE TABLE'
             ORDER BY table_name
         """)
 
@@ -279,6 +344,776 @@ def recreate_schema(conn):
     finally:
         cursor.close()
 
+# Tabelas que recebem escrita em massa do importador e do bot
+MAINTENANCE_TABLES = [
+    'customers',
+    'pets',
+    'vaccines',
+    'grooming_services',
+    'appointments',
+    'reactivation_logs',
+]
+
+def get_table_health(conn, tables):
+    """Retorna estatísticas de linhas vivas/mortas e modificações desde o último ANALYZE"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+               GREATEST(last_analyze, last_autoanalyze) AS last_analyzed
+        FROM pg_stat_user_tables
+        WHERE schemaname = current_schema() AND relname = ANY(%s)
+    """, (list(tables),))
+
+    health = {}
+    for table, live, dead, modified, last_analyzed in cursor.fetchall():
+        health[table] = {
+            'live': live,
+            'dead': dead,
+            'modified': modified,
+            'last_analyzed': last_analyzed,
+        }
+
+    cursor.close()
+    return health
+
+def maintain_table(table, vacuum, db_config=None):
+    """Executa VACUUM (ANALYZE) ou ANALYZE em uma tabela usando conexão própria"""
+    conn = psycopg2.connect(**(db_config or DB_CONFIG))
+    conn.autocommit = True  # VACUUM não roda dentro de transação
+    cursor = conn.cursor()
+    start = time.time()
+
+    try:
+        if vacuum:
+            cursor.execute(sql.SQL("VACUUM (ANALYZE) {}").format(sql.Identifier(table)))
+        else:
+            cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+        return table, time.time() - start, None
+    except Exception as e:
+        return table, time.time() - start, e
+    finally:
+        cursor.close()
+        conn.close()
+
+def show_index_health(conn, tables):
+    """Lista índices inválidos e índices nunca usados nas tabelas mantidas"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT s.relname, s.indexrelname, s.idx_scan, i.indisvalid,
+               pg_size_pretty(pg_relation_size(s.indexrelid))
+        FROM pg_stat_user_indexes s
+        JOIN pg_index i ON i.indexrelid = s.indexrelid
+        WHERE s.schemaname = current_schema()
+          AND s.relname = ANY(%s)
+          AND (NOT i.indisvalid OR (s.idx_scan = 0 AND NOT i.indisunique))
+        ORDER BY s.relname, s.indexrelname
+    """, (list(tables),))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    print()
+    print_info("Saúde dos índices:")
+    if not rows:
+        print_success("Nenhum índice inválido ou sem uso")
+        return
+
+    for table, index, scans, valid, size in rows:
+        if not valid:
+            print_error(f"{table}.{index}: INVÁLIDO ({size}) - recriar com REINDEX")
+        else:
+            print_warning(f"{table}.{index}: nunca usado desde o último reset de estatísticas ({size})")
+
+def run_maintenance(conn, threshold=0.1, workers=3, force=False, db_config=None, exit_on_error=True):
+    """
+    Roda ANALYZE/VACUUM em paralelo nas tabelas que mudaram além do limite.
+
+    Uma tabela recebe ANALYZE quando n_mod_since_analyze / n_live_tup >= threshold
+    e VACUUM (ANALYZE) quando n_dead_tup / n_live_tup >= threshold.
+    Atua no schema corrente de `conn`; `db_config` (mesmo banco e search_path)
+    é usado nas conexões paralelas - o padrão é DB_CONFIG. Com exit_on_error=False
+    os erros sobem como exceção em vez de encerrar o processo.
+    """
+    print_header("MANUTENÇÃO (ANALYZE / VACUUM)")
+
+    ensure_partitions(conn, exit_on_error=exit_on_error)
+    print()
+
+    # Tabelas particionadas não têm estatísticas próprias: avaliar cada partição
+    tables = list(MAINTENANCE_TABLES)
+    cursor = conn.cursor()
+    partitioned = is_partitioned(cursor)
+    if partitioned:
+        tables.remove(PARTITIONED_TABLE)
+        tables += [name for name, _ in list_partitions(cursor)] + [f'{PARTITIONED_TABLE}_default']
+    cursor.close()
+
+    before = get_table_health(conn, tables)
+
+    jobs = []
+    for table in tables:
+        if table not in before:
+            continue
+        stats = before[table]
+        base = max(stats['live'], 1)
+        vacuum = force or stats['dead'] / base >= threshold
+        analyze = force or stats['modified'] / base >= threshold
+
+        if vacuum or analyze:
+            jobs.append((table, vacuum))
+            action = 'VACUUM (ANALYZE)' if vacuum else 'ANALYZE'
+            print_info(f"{table}: {stats['modified']:,} modificações, {stats['dead']:,} linhas mortas -> {action}")
+        else:
+            print(f"  {table}: dentro do limite ({threshold:.0%}), ignorada")
+
+    # O autovacuum nunca analisa o pai particionado; o planner usa essas estatísticas
+    if partitioned and any(table.startswith(f'{PARTITIONED_TABLE}_') for table, _ in jobs):
+        jobs.append((PARTITIONED_TABLE, False))
+
+    if not jobs:
+        print()
+        print_success("Nenhuma tabela precisa de manutenção")
+        show_index_health(conn, tables)
+        return
+
+    print()
+    print_info(f"Executando {len(jobs)} tarefa(s) com {workers} conexões paralelas...")
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda job: maintain_table(*job, db_config), jobs))
+
+    elapsed = time.time() - start
+    conn.rollback()  # Nova transação para enxergar as estatísticas atualizadas
+    after = get_table_health(conn, tables)
+
+    print()
+    reclaimed_total = 0
+    for table, duration, error in results:
+        if error:
+            print_error(f"{table}: erro após {duration:.2f}s - {error}")
+            continue
+        if table not in before:
+            print_success(f"{table}: {duration:.2f}s (ANALYZE do pai particionado)")
+            continue
+        reclaimed = max(before[table]['dead'] - after.get(table, before[table])['dead'], 0)
+        reclaimed_total += reclaimed
+        print_success(f"{table}: {duration:.2f}s, {reclaimed:,} linhas mortas recuperadas")
+
+    print()
+    print_success(f"Manutenção concluída em {elapsed:.2f}s ({reclaimed_total:,} linhas mortas recuperadas)")
+
+    show_index_health(conn, tables)
+
+def add_months(month, count):
+    """Primeiro dia do mês deslocado em `count` meses"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month):
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+def is_partitioned(cursor):
+    """Verifica se reactivation_logs já é uma tabela particionada"""
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relname = %s
+    """, (PARTITIONED_TABLE,))
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+def list_partitions(cursor):
+    """Retorna [(nome, mês)] das partições mensais anexadas, em ordem"""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(quote_ident(current_schema()) || '.' || %s)
+    """, (PARTITIONED_TABLE,))
+
+    partitions = []
+    pattern = re.compile(rf'^{PARTITIONED_TABLE}_(\d{{4}})_(\d{{2}})$')
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+def create_month_partition(cursor, month):
+    """
+    Cria a partição do mês. Linhas do mês que caíram na partição default são
+    movidas para a nova tabela antes do ATTACH.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(quote_ident(current_schema()) || '.' || %s)", (name,))
+    if cursor.fetchone()[0]:
+        return False
+
+    parent = sql.Identifier(PARTITIONED_TABLE)
+    partition = sql.Identifier(name)
+    default = sql.Identifier(f'{PARTITIONED_TABLE}_default')
+    start, end = month, add_months(month, 1)
+
+    cursor.execute(sql.SQL(
+        "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ).format(partition, parent))
+
+    cursor.execute("SELECT to_regclass(quote_ident(current_schema()) || '.' || %s)",
+                   (f'{PARTITIONED_TABLE}_default',))
+    if cursor.fetchone()[0]:
+        cursor.execute(sql.SQL("""
+            WITH moved AS (
+                DELETE FROM {} WHERE sent_at >= %s AND sent_at < %s RETURNING *
+            )
+            INSERT INTO {} SELECT * FROM moved
+        """).format(default, partition), (start, end))
+
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})").format(
+        parent, partition, sql.Literal(start.isoformat()), sql.Literal(end.isoformat())
+    ))
+    return True
+
+def ensure_partitions(conn, ahead=PARTITION_AHEAD_MONTHS, exit_on_error=True, verbose=True):
+    """
+    Garante partições do mês atual até `ahead` meses à frente. Com
+    verbose=False só avisa quando cria partições ou há linhas na default.
+    """
+    cursor = conn.cursor()
+
+    try:
+        if not is_partitioned(cursor):
+            if verbose:
+                print_warning(f"'{PARTITIONED_TABLE}' não é particionada - rode 'partition migrate'")
+            return
+
+        current = date.today().replace(day=1)
+        created = 0
+        for offset in range(ahead + 1):
+            if create_month_partition(cursor, add_months(current, offset)):
+                print_success(f"Partição criada: {partition_name(add_months(current, offset))}")
+                created += 1
+        conn.commit()
+
+        if created == 0 and verbose:
+            print_info(f"Partições de {current:%Y-%m} a {add_months(current, ahead):%Y-%m} já existem")
+
+        cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(
+            sql.Identifier(f'{PARTITIONED_TABLE}_default')
+        ))
+        in_default = cursor.fetchone()[0]
+        if in_default:
+            print_warning(f"{in_default:,} linhas na partição default (fora dos meses criados)")
+
+    except Exception as e:
+        conn.rollback()
+        print_error(f"Erro ao criar partições: {e}")
+        if exit_on_error:
+            sys.exit(1)
+        raise
+    finally:
+        cursor.close()
+
+def ensure_future_partitions(conn):
+    """
+    Chamada pelo importador e pelo rollup a cada execução, para que os meses
+    seguintes nunca dependam de um cron: não encerra o processo em caso de erro.
+    """
+    try:
+        ensure_partitions(conn, exit_on_error=False, verbose=False)
+    except Exception as e:
+        print_warning(f"Não foi possível garantir as partições de {PARTITIONED_TABLE}: {e}")
+
+def stranded_months(cursor, cutoff):
+    """Meses anteriores a `cutoff` com linhas presas na partição default: [(mês, linhas)]"""
+    cursor.execute("SELECT to_regclass(quote_ident(current_schema()) || '.' || %s)",
+                   (f'{PARTITIONED_TABLE}_default',))
+    if not cursor.fetchone()[0]:
+        return []
+    cursor.execute(sql.SQL("""
+        SELECT DATE_TRUNC('month', sent_at)::DATE, COUNT(*) FROM {}
+        WHERE sent_at < %s
+        GROUP BY 1 ORDER BY 1
+    """).format(sql.Identifier(f'{PARTITIONED_TABLE}_default')), (cutoff,))
+    return cursor.fetchall()
+
+def migrate_to_partitions(conn):
+    """Converte reactivation_logs em tabela particionada por mês (sent_at)"""
+    cursor = conn.cursor()
+
+    print_header("PARTICIONAR REACTIVATION_LOGS")
+
+    if is_partitioned(cursor):
+        print_info(f"'{PARTITIONED_TABLE}' já é particionada")
+        cursor.close()
+        ensure_partitions(conn)
+        return
+
+    legacy = f'{PARTITIONED_TABLE}_legacy'
+    parent = sql.Identifier(PARTITIONED_TABLE)
+
+    try:
+        start = time.time()
+        cursor.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(parent))
+        cursor.execute(sql.SQL("SELECT MIN(sent_at), MAX(sent_at), COUNT(*) FROM {}").format(parent))
+        min_sent, max_sent, total = cursor.fetchone()
+        print_info(f"{total:,} registros entre {min_sent} e {max_sent}")
+
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (PARTITIONED_TABLE,))
+        sequence = cursor.fetchone()[0]
+
+        # A sequence pertence à tabela antiga e seria removida junto com ela
+        if sequence:
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(parent, sql.Identifier(legacy)))
+        cursor.execute(sql.SQL("""
+            CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS)
+            PARTITION BY RANGE (sent_at)
+        """).format(parent, sql.Identifier(legacy)))
+        cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(
+            sql.Identifier(f'{PARTITIONED_TABLE}_default'), parent
+        ))
+
+        first = (min_sent.date() if min_sent else date.today()).replace(day=1)
+        last = add_months(date.today().replace(day=1), PARTITION_AHEAD_MONTHS)
+        if max_sent and max_sent.date() > last:
+            last = max_sent.date().replace(day=1)
+
+        month, created = first, 0
+        while month <= last:
+            create_month_partition(cursor, month)
+            created += 1
+            month = add_months(month, 1)
+        print_success(f"{created} partições mensais criadas ({first:%Y-%m} a {last:%Y-%m})")
+
+        cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM {}").format(parent, sql.Identifier(legacy)))
+        print_success(f"{cursor.rowcount:,} registros copiados")
+
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(legacy)))
+        if sequence:
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARTITIONED_TABLE}.id")
+
+        # Índices criados depois da carga (propagam para todas as partições)
+        print_info("Criando chave primária, FK e índices...")
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD PRIMARY KEY (id, sent_at)").format(parent))
+        cursor.execute(sql.SQL(
+            "ALTER TABLE {} ADD FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE"
+        ).format(parent))
+        for column in ('customer_id', 'reactivation_type', 'sent_at', 'status'):
+            cursor.execute(sql.SQL("CREATE INDEX {} ON {} ({})").format(
+                sql.Identifier(f'idx_{PARTITIONED_TABLE}_{column}'), parent, sql.Identifier(column)
+            ))
+
+        conn.commit()
+        print()
+        print_success(f"Migração concluída em {time.time() - start:.2f}s")
+
+    except Exception as e:
+        conn.rollback()
+        print_error(f"Erro na migração (nada foi alterado): {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+
+def show_partitions(conn):
+    """Lista as partições com contagem e tamanho"""
+    cursor = conn.cursor()
+
+    print_header("PARTIÇÕES DE REACTIVATION_LOGS")
+
+    if not is_partitioned(cursor):
+        print_warning(f"'{PARTITIONED_TABLE}' não é particionada - rode 'partition migrate'")
+        cursor.close()
+        return
+
+    for name, month in list_partitions(cursor) + [(f'{PARTITIONED_TABLE}_default', None)]:
+        cursor.execute(sql.SQL("SELECT COUNT(*), pg_size_pretty(pg_total_relation_size(%s)) FROM {}").format(
+            sql.Identifier(name)
+        ), (name,))
+        count, size = cursor.fetchone()
+        print(f"  {name}: {count:,} registros ({size})")
+
+    cursor.close()
+
+def archive_old_partitions(conn, keep_months, archive_dir=LOG_ARCHIVE_DIR, drop=True, confirm=True):
+    """
+    Exporta partições mais antigas que `keep_months` para CSV comprimido,
+    faz DETACH e (por padrão) DROP - sem DELETEs grandes.
+    """
+    cursor = conn.cursor()
+
+    print_header("RETENÇÃO DE REACTIVATION_LOGS")
+
+    if not is_partitioned(cursor):
+        print_error(f"'{PARTITIONED_TABLE}' não é particionada - rode 'partition migrate' primeiro")
+        sys.exit(1)
+
+    cutoff = add_months(date.today().replace(day=1), -keep_months)
+    expired = [(name, month) for name, month in list_partitions(cursor) if month < cutoff]
+
+    # Meses antigos que nunca tiveram partição ficaram na default: sem tratar,
+    # essas linhas escapariam da retenção para sempre
+    stranded = stranded_months(cursor, cutoff)
+    conn.rollback()
+
+    if not expired and not stranded:
+        print_info(f"Nenhuma partição anterior a {cutoff:%Y-%m}")
+        cursor.close()
+        return
+
+    print_info(f"Partições anteriores a {cutoff:%Y-%m} (mantendo {keep_months} meses):")
+    for name, _ in expired:
+        print(f"  {name}")
+    for month, count in stranded:
+        print(f"  {partition_name(month)} ({count:,} registros na partição default, será criada)")
+    print()
+
+    if confirm:
+        action = 'ARQUIVADAS E REMOVIDAS' if drop else 'ARQUIVADAS E DESANEXADAS'
+        print_warning(f"ATENÇÃO: {len(expired) + len(stranded)} partições serão {action}!")
+        response = input(f"{Colors.WARNING}Digite 'ARQUIVAR' para continuar: {Colors.ENDC}")
+        if response != 'ARQUIVAR':
+            print_error("Operação cancelada pelo usuário.")
+            sys.exit(0)
+
+    # Cria as partições desses meses (move as linhas da default) para arquivá-las junto
+    for month, count in stranded:
+        try:
+            create_month_partition(cursor, month)
+            conn.commit()
+            expired.append((partition_name(month), month))
+            print_success(f"{partition_name(month)}: {count:,} registros movidos da partição default")
+        except Exception as e:
+            conn.rollback()
+            print_error(f"{partition_name(month)}: erro ao mover da partição default - {e}")
+    expired.sort(key=lambda p: p[1])
+
+    os.makedirs(archive_dir, exist_ok=True)
+
+    for name, month in expired:
+        target = os.path.join(archive_dir, f"{name}.csv.gz")
+        tmp_target = target + '.tmp'
+
+        try:
+            with gzip.open(tmp_target, 'wt', encoding='utf-8') as f:
+                cursor.copy_expert(
+                    sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(name)).as_string(conn),
+                    f,
+                )
+            exported = cursor.rowcount
+            os.replace(tmp_target, target)
+
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(PARTITIONED_TABLE), sql.Identifier(name)
+            ))
+            if drop:
+                cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            conn.commit()
+
+            size = os.path.getsize(target) / 1024
+            print_success(f"{name}: {exported:,} registros -> {target} ({size:,.1f} KB)")
+
+        except Exception as e:
+            conn.rollback()
+            if os.path.exists(tmp_target):
+                os.remove(tmp_target)
+            print_error(f"{name}: erro ao arquivar - {e}")
+
+    cursor.close()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_user_tables(cursor):
+    """Tabelas do schema atual (pais particionados, sem as partições)"""
+    cursor.execute("""
+        SELECT c.relname, c.relkind = 'p' AS partitioned
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+        ORDER BY pg_total_relation_size(c.oid) DESC
+    """)
+    return cursor.fetchall()
+
+def get_table_columns(cursor, table):
+    cursor.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(quote_ident(current_schema()) || '.' || quote_ident(%s))
+          AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+def snapshot_table(snapshot_id, table, partitioned, target_dir):
+    """Exporta uma tabela com COPY TO STDOUT usando o snapshot exportado pelo coordenador"""
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cursor = conn.cursor()
+    path = os.path.join(target_dir, f"{table}.copy.gz")
+    start = time.time()
+
+    try:
+        cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+        # COPY direto não funciona em tabela particionada
+        source = sql.SQL("(SELECT * FROM {})" if partitioned else "{}").format(sql.Identifier(table))
+        with gzip.open(path, 'wb', compresslevel=3) as f:
+            cursor.copy_expert(sql.SQL("COPY {} TO STDOUT").format(source).as_string(conn), f)
+        rows = cursor.rowcount
+        conn.rollback()
+        return table, {
+            'file': os.path.basename(path),
+            'rows': rows,
+            'bytes': os.path.getsize(path),
+            'sha256': file_sha256(path),
+            'seconds': round(time.time() - start, 2),
+        }
+    finally:
+        cursor.close()
+        conn.close()
+
+def create_snapshot(conn, workers=4, target_root=SNAPSHOT_DIR):
+    """
+    Exporta todas as tabelas em paralelo para arquivos .copy.gz + manifest.json.
+    Todas as conexões usam o mesmo snapshot (pg_export_snapshot), então o
+    resultado é consistente mesmo com o bot escrevendo durante a exportação.
+    """
+    print_header("SNAPSHOT DO BANCO")
+
+    name = datetime.now().strftime('%Y%m%d_%H%M%S')
+    target_dir = os.path.join(target_root, name)
+    tmp_dir = target_dir + '.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    conn.rollback()
+    conn.set_session(isolation_level='REPEATABLE READ')
+    cursor = conn.cursor()
+    start = time.time()
+
+    try:
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot_id = cursor.fetchone()[0]
+
+        tables = list_user_tables(cursor)
+        columns = {table: get_table_columns(cursor, table) for table, _ in tables}
+        cursor.execute("""
+            SELECT sequencename, last_value FROM pg_sequences WHERE schemaname = current_schema()
+        """)
+        sequences = {seq: value for seq, value in cursor.fetchall()}
+
+        print_info(f"Exportando {len(tables)} tabelas com {workers} conexões paralelas...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(snapshot_table, snapshot_id, table, partitioned, tmp_dir)
+                       for table, partitioned in tables]
+            results = dict(future.result() for future in futures)
+
+        for table, _ in tables:
+            info = results[table]
+            info['columns'] = columns[table]
+            print_success(f"{table}: {info['rows']:,} registros, {info['bytes'] / 1024:,.1f} KB ({info['seconds']}s)")
+
+        manifest = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': DB_CONFIG['database'],
+            'host': DB_CONFIG['host'],
+            'tables': results,
+            'sequences': sequences,
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        os.replace(tmp_dir, target_dir)
+
+    except Exception as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        print_error(f"Erro ao criar snapshot: {e}")
+        sys.exit(1)
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.set_session(isolation_level='DEFAULT')
+
+    total_rows = sum(info['rows'] for info in results.values())
+    print()
+    print_success(f"Snapshot criado em {time.time() - start:.2f}s: {target_dir} ({total_rows:,} registros)")
+    return target_dir
+
+def staging_table(table):
+    """Tabela auxiliar onde o snapshot da tabela é carregado antes da troca"""
+    return f"_restore_{table}"
+
+def restore_table(table, info, snapshot_dir):
+    """
+    Carrega uma tabela em uma tabela auxiliar UNLOGGED (sem índices nem FKs)
+    com COPY FROM STDIN, usando conexão própria. A tabela real não é tocada.
+    """
+    conn = psycopg2.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    start = time.time()
+    staging = sql.Identifier(staging_table(table))
+
+    try:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+        cursor.execute(sql.SQL("CREATE UNLOGGED TABLE {} (LIKE {})").format(staging, sql.Identifier(table)))
+        columns = sql.SQL(', ').join(sql.Identifier(column) for column in info['columns'])
+        with gzip.open(os.path.join(snapshot_dir, info['file']), 'rb') as f:
+            cursor.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN").format(staging, columns).as_string(conn), f
+            )
+        conn.commit()
+        return table, time.time() - start
+    finally:
+        cursor.close()
+        conn.close()
+
+def index_ddl(indexdef):
+    """
+    DDL para recriar um índice. Em tabela particionada o pg_get_indexdef devolve
+    `ON ONLY`, que criaria apenas o índice do pai (inválido, sem as partições).
+
+    >>> index_ddl('CREATE INDEX idx_logs_sent_at ON ONLY public.reactivation_logs USING btree (sent_at)')
+    'CREATE INDEX idx_logs_sent_at ON public.reactivation_logs USING btree (sent_at)'
+    >>> index_ddl('CREATE INDEX idx_pets_customer_id ON public.pets USING btree (customer_id)')
+    'CREATE INDEX idx_pets_customer_id ON public.pets USING btree (customer_id)'
+    """
+    return indexdef.replace(' ON ONLY ', ' ON ', 1)
+
+def restore_snapshot(conn, snapshot_dir, workers=4, confirm=True, verify=True):
+    """
+    Restaura um snapshot: carrega as tabelas em paralelo com COPY FROM em tabelas
+    auxiliares e, quando todas carregaram, troca os dados em uma única transação
+    (remove FKs e índices secundários, TRUNCATE, INSERT, recria índices e FKs).
+    Qualquer falha desfaz a transação e mantém os dados atuais.
+    """
+    print_header("RESTAURAR SNAPSHOT")
+
+    manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        print_error(f"Manifest não encontrado: {manifest_path}")
+        sys.exit(1)
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    tables = manifest['tables']
+    total_rows = sum(info['rows'] for info in tables.values())
+    print_info(f"Snapshot de {manifest['created_at']} ({manifest['database']} @ {manifest['host']})")
+    print_info(f"{len(tables)} tabelas, {total_rows:,} registros")
+
+    if verify:
+        print_info("Verificando integridade dos arquivos...")
+        for table, info in tables.items():
+            path = os.path.join(snapshot_dir, info['file'])
+            if not os.path.exists(path) or file_sha256(path) != info['sha256']:
+                print_error(f"Arquivo corrompido ou ausente: {info['file']}")
+                sys.exit(1)
+        print_success("Arquivos íntegros")
+
+    cursor = conn.cursor()
+    existing = {table for table, _ in list_user_tables(cursor)}
+    missing = sorted(set(tables) - existing)
+    if missing:
+        print_error(f"Tabelas do snapshot não existem no banco: {', '.join(missing)}")
+        print_info("Rode 'recreate' antes de restaurar")
+        sys.exit(1)
+
+    if confirm:
+        print()
+        print_warning("ATENÇÃO: Os dados atuais dessas tabelas serão SUBSTITUÍDOS!")
+        response = input(f"{Colors.WARNING}Digite 'RESTAURAR' para continuar: {Colors.ENDC}")
+        if response != 'RESTAURAR':
+            print_error("Operação cancelada pelo usuário.")
+            sys.exit(0)
+
+    print()
+    start = time.time()
+    names = list(tables)
+
+    try:
+        print_info(f"Carregando dados com {workers} conexões paralelas...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(restore_table, table, info, snapshot_dir)
+                       for table, info in sorted(tables.items(), key=lambda t: -t[1]['bytes'])]
+            for future in futures:
+                table, duration = future.result()
+                print_success(f"{table}: {tables[table]['rows']:,} registros ({duration:.2f}s)")
+
+        # FKs e índices secundários são recriados depois da carga, na mesma transação
+        cursor.execute("""
+            SELECT c.relname, con.conname, pg_get_constraintdef(con.oid)
+            FROM pg_constraint con
+            JOIN pg_class c ON c.oid = con.conrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE con.contype = 'f' AND con.conparentid = 0
+              AND n.nspname = current_schema() AND c.relname = ANY(%s)
+        """, (names,))
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = current_schema() AND c.relname = ANY(%s)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)
+        """, (names,))
+        indexes = cursor.fetchall()
+
+        print()
+        print_info("Substituindo os dados...")
+        for table, name, _ in foreign_keys:
+            cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                sql.Identifier(table), sql.Identifier(name)
+            ))
+        for index, _ in indexes:
+            cursor.execute(sql.SQL("DROP INDEX {}").format(sql.SQL(index)))
+        cursor.execute(sql.SQL("TRUNCATE {}").format(
+            sql.SQL(', ').join(sql.Identifier(table) for table in names)
+        ))
+        for table in names:
+            columns = sql.SQL(', ').join(sql.Identifier(column) for column in tables[table]['columns'])
+            cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+                sql.Identifier(table), columns, columns, sql.Identifier(staging_table(table))
+            ))
+
+        print_info(f"Recriando {len(indexes)} índices e {len(foreign_keys)} FKs...")
+        for _, indexdef in indexes:
+            cursor.execute(index_ddl(indexdef))
+        for table, name, definition in foreign_keys:
+            cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                sql.Identifier(table), sql.Identifier(name), sql.SQL(definition)
+            ))
+
+        for sequence, value in manifest['sequences'].items():
+            if value is not None:
+                cursor.execute(
+                    "SELECT setval((quote_ident(current_schema()) || '.' || quote_ident(%s))::regclass, %s)",
+                    (sequence, value)
+                )
+        conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        print_error(f"Erro durante restauração: {e}")
+        print_info("Nenhuma alteração aplicada: os dados atuais foram mantidos")
+        sys.exit(1)
+
+    finally:
+        conn.rollback()
+        for table in names:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging_table(table))))
+        conn.commit()
+        cursor.close()
+
+    # Estatísticas do planner ficam vazias após TRUNCATE + INSERT
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda table: maintain_table(table, False), names))
+
+    invalidate_import_cache()
+    print()
+    print_success(f"Restauração concluída em {time.time() - start:.2f}s ({total_rows:,} registros)")
+
 def show_statistics(conn):
     """Mostra estatísticas do banco de dados"""
     cursor = conn.cursor()
@@ -317,7 +1152,7 @@ def show_statistics(conn):
             tablename,
             pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) AS size
         FROM pg_tables
-        WHERE schemaname = 'public'
+        WHERE schemaname = current_schema()
         ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
     """)
 
@@ -343,6 +1178,17 @@ def main():
         print(f"  clean              - Limpa todos os dados (com confirmação)")
         print(f"  clean --force      - Limpa todos os dados (sem confirmação)")
         print(f"  recreate           - Dropa e recria schema completo")
+        print(f"  maintain           - ANALYZE/VACUUM nas tabelas alteradas")
+        print(f"      [--threshold=0.1] [--workers=3] [--all]")
+        print(f"  partition migrate  - Particiona reactivation_logs por mês")
+        print(f"  partition ensure   - Cria partições dos próximos meses")
+        print(f"  partition list     - Lista partições")
+        print(f"  retention          - Arquiva e remove partições antigas")
+        print(f"      [--keep-months=12] [--archive-dir=PATH] [--keep-tables] [--force]")
+        print(f"  snapshot           - Exporta todas as tabelas em paralelo [--workers=4]")
+        print(f"  restore <dir>      - Restaura um snapshot [--workers=4] [--force] [--no-verify]")
+        print()
+        print(f"  clean/recreate aceitam --snapshot para criar um snapshot antes")
         print()
         sys.exit(1)
 
@@ -357,15 +1203,65 @@ def main():
 
         elif command == 'clean':
             force = '--force' in sys.argv
+            if '--snapshot' in sys.argv:
+                create_snapshot(conn, workers=int(get_option('workers', '4')))
             drop_all_data(conn, confirm=not force)
+            invalidate_import_cache()
             print()
             show_statistics(conn)
 
         elif command == 'recreate':
+            if '--snapshot' in sys.argv:
+                create_snapshot(conn, workers=int(get_option('workers', '4')))
             recreate_schema(conn)
+            invalidate_import_cache()
             print()
             show_statistics(conn)
 
+        elif command == 'maintain':
+            run_maintenance(
+                conn,
+                threshold=float(get_option('threshold', '0.1')),
+                workers=int(get_option('workers', '3')),
+                force='--all' in sys.argv,
+            )
+
+        elif command == 'snapshot':
+            create_snapshot(conn, workers=int(get_option('workers', '4')))
+
+        elif command == 'restore':
+            if len(sys.argv) < 3 or sys.argv[2].startswith('--'):
+                print_error("Informe o diretório do snapshot: restore <dir>")
+                sys.exit(1)
+            restore_snapshot(
+                conn,
+                sys.argv[2],
+                workers=int(get_option('workers', '4')),
+                confirm='--force' not in sys.argv,
+                verify='--no-verify' not in sys.argv,
+            )
+
+        elif command == 'partition':
+            action = sys.argv[2] if len(sys.argv) > 2 else 'list'
+            if action == 'migrate':
+                migrate_to_partitions(conn)
+            elif action == 'ensure':
+                ensure_partitions(conn, ahead=int(get_option('ahead', str(PARTITION_AHEAD_MONTHS))))
+            elif action == 'list':
+                show_partitions(conn)
+            else:
+                print_error(f"Ação desconhecida: partition {action}")
+                sys.exit(1)
+
+        elif command == 'retention':
+            archive_old_partitions(
+                conn,
+                keep_months=int(get_option('keep-months', '12')),
+                archive_dir=get_option('archive-dir', LOG_ARCHIVE_DIR),
+                drop='--keep-tables' not in sys.argv,
+                confirm='--force' not in sys.argv,
+            )
+
         else:
             print_error(f"Comando desconhecido: {command}")
             sys.exit(1)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Columnar Export
+Exporta as tabelas para Parquet / Arrow IPC (incremental por watermark) para analytics
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from db_cleanup import (
+    DB_CONFIG, Colors, get_connection, get_option,
+    print_header, print_success, print_warning, print_error, print_info,
+)
+
+EXPORT_DIR = os.getenv('DB_EXPORT_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'exports'
+))
+
+# Tabela -> coluna usada como watermark nas exportações incrementais.
+# Todas precisam da coluna EXPORT_KEY_COLUMN (deduplicação da janela relida).
+EXPORT_TABLES = {
+    'customers': 'updated_at',
+    'pets': 'updated_at',
+    'vaccines': 'updated_at',
+    'grooming_services': 'updated_at',
+    'appointments': 'updated_at',
+    'medical_history': 'updated_at',
+    'weight_history': 'created_at',
+    'completed_services': 'updated_at',
+    'reactivation_logs': 'sent_at',
+}
+
+EXPORT_KEY_COLUMN = 'id'
+
+# Fuso em que o banco grava os TIMESTAMP sem fuso (NOW()/CURRENT_TIMESTAMP).
+# O horizonte (xact_start, timestamptz) é convertido para ele antes de ser
+# comparado com o watermark.
+EXPORT_TIMEZONE = os.getenv('DB_EXPORT_TIMEZONE', 'America/Sao_Paulo')
+
+def arrow_type(pa, column):
+    """Tipo Arrow a partir do OID do Postgres (cursor.description)"""
+    oid = column.type_code
+    if oid == 16:
+        return pa.bool_()
+    if oid in (20, 21, 23):
+        return pa.int64() if oid == 20 else pa.int32()
+    if oid in (700, 701):
+        return pa.float64()
+    if oid == 1700:
+        if column.precision and column.precision <= 38 and column.scale is not None:
+            return pa.decimal128(column.precision, column.scale)
+        return pa.float64()
+    if oid == 1082:
+        return pa.date32()
+    if oid == 1114:
+        return pa.timestamp('us')
+    if oid == 1184:
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()  # texto, enums, JSON/JSONB (serializado)
+
+def arrow_batch(pa, schema, rows):
+    """Converte um lote de tuplas em RecordBatch com o schema tipado"""
+    columns = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [
+                None if value is None
+                else json.dumps(value, ensure_ascii=False, default=str) if isinstance(value, (dict, list))
+                else str(value)
+                for value in values
+            ]
+        elif pa.types.is_floating(field.type):
+            values = [None if value is None else float(value) for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def export_table(conn, pa, table, watermark_column, since, target_dir, file_format, chunk_size,
+                 skip=None, horizon=None):
+    """
+    Exporta uma tabela em lotes com cursor server-side, gravando um arquivo
+    por execução. `skip` são pares (id, watermark) já exportados na janela
+    de sobreposição. Retorna (linhas, maior watermark, pares acima do horizonte).
+    """
+    cursor = conn.cursor(name=f'export_{table}')
+    cursor.itersize = chunk_size
+    column = sql.Identifier(watermark_column)
+
+    query = sql.SQL("SELECT * FROM {}").format(sql.Identifier(table))
+    params = []
+    if since:
+        query += sql.SQL(" WHERE {} > %s").format(column)
+        params.append(since)
+        if skip:
+            query += sql.SQL(
+                " AND ({}, {}) NOT IN (SELECT * FROM unnest(%s::BIGINT[], %s::TIMESTAMP[]))"
+            ).format(sql.Identifier(EXPORT_KEY_COLUMN), column)
+            params += [[row_id for row_id, _ in skip], [value for _, value in skip]]
+    query += sql.SQL(" ORDER BY {}").format(column)
+    cursor.execute(query, params or None)
+
+    rows = cursor.fetchmany(chunk_size)
+    if not rows:
+        cursor.close()
+        return 0, None, []
+
+    names = [column.name for column in cursor.description]
+    schema = pa.schema([(column.name, arrow_type(pa, column)) for column in cursor.description])
+    watermark_index = names.index(watermark_column)
+    id_index = names.index(EXPORT_KEY_COLUMN)
+
+    # Particionado por data de exportação (layout Hive: export_date=AAAA-MM-DD).
+    # Nome único por execução; o arquivo só aparece com o nome final depois de completo.
+    partition_dir = os.path.join(target_dir, table, f"export_date={date.today().isoformat()}")
+    os.makedirs(partition_dir, exist_ok=True)
+    extension = 'parquet' if file_format == 'parquet' else 'arrow'
+    filename = f"part-{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}.{extension}"
+    path = os.path.join(partition_dir, filename)
+    tmp_path = os.path.join(partition_dir, f".{filename}.tmp")
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+        write = writer.write_batch
+    else:
+        sink = pa.OSFile(tmp_path, 'wb')
+        writer = pa.ipc.new_file(sink, schema)
+        write = writer.write_batch
+
+    total = 0
+    max_watermark = None
+    recent = []
+    completed = False
+    try:
+        while rows:
+            write(arrow_batch(pa, schema, rows))
+            total += len(rows)
+            last = rows[-1][watermark_index]
+            if last is not None:
+                max_watermark = last
+            if horizon and last is not None and last > horizon:
+                recent += [
+                    (row[id_index], row[watermark_index]) for row in rows
+                    if row[watermark_index] is not None and row[watermark_index] > horizon
+                ]
+            rows = cursor.fetchmany(chunk_size)
+        completed = True
+    finally:
+        writer.close()
+        if file_format != 'parquet':
+            sink.close()
+        cursor.close()
+        if completed:
+            os.replace(tmp_path, path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return total, max_watermark, recent
+
+def load_export_state(state_path):
+    """
+    Lê o estado da exportação: por tabela, o watermark e os pares (id, watermark)
+    já exportados acima dele. Aceita o formato antigo (só o watermark).
+    """
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    state = {}
+    for table, entry in raw.items():
+        if isinstance(entry, str):
+            entry = {'watermark': entry, 'overlap': []}
+        state[table] = {
+            'watermark': datetime.fromisoformat(entry['watermark']) if entry.get('watermark') else None,
+            'overlap': [(row_id, datetime.fromisoformat(value)) for row_id, value in entry.get('overlap', [])],
+        }
+    return state
+
+def save_export_state(state_path, state):
+    """Grava o estado da exportação de forma atômica"""
+    raw = {
+        table: {
+            'watermark': entry['watermark'].isoformat() if entry['watermark'] else None,
+            'overlap': [[row_id, value.isoformat()] for row_id, value in entry['overlap']],
+        }
+        for table, entry in state.items()
+    }
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(raw, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def validate_export_tables(cursor, tables):
+    """Encerra com erro se alguma tabela não tem a coluna de watermark ou a chave"""
+    cursor.execute("""
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = ANY(%s)
+    """, (tables,))
+    columns = {}
+    for table, column in cursor.fetchall():
+        columns.setdefault(table, set()).add(column)
+
+    problems = []
+    for table in tables:
+        if table not in columns:
+            problems.append(f"{table}: tabela não existe")
+            continue
+        for column in (EXPORT_TABLES[table], EXPORT_KEY_COLUMN):
+            if column not in columns[table]:
+                problems.append(f"{table}: sem a coluna '{column}'")
+
+    if problems:
+        for problem in problems:
+            print_error(problem)
+        print_info(f"Toda tabela em EXPORT_TABLES precisa do watermark e de '{EXPORT_KEY_COLUMN}'")
+        sys.exit(1)
+
+def export_dataset(conn, target_dir=EXPORT_DIR, file_format='parquet', full=False,
+                   tables=None, chunk_size=50000):
+    """Exporta as tabelas para Parquet/Arrow, incremental pelo watermark de cada tabela"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print_error("pyarrow não instalado: pip install pyarrow")
+        sys.exit(1)
+
+    print_header("EXPORTAÇÃO COLUNAR")
+
+    state_path = os.path.join(target_dir, '_export_state.json')
+    state = load_export_state(state_path)
+
+    selected = tables or list(EXPORT_TABLES)
+    for table in [table for table in selected if table not in EXPORT_TABLES]:
+        print_warning(f"{table}: tabela não exportável, ignorada")
+    selected = [table for table in selected if table in EXPORT_TABLES]
+
+    cursor = conn.cursor()
+    validate_export_tables(cursor, selected)
+    cursor.close()
+
+    os.makedirs(target_dir, exist_ok=True)
+    print_info(f"Formato: {file_format}, destino: {target_dir}, {'completa' if full else 'incremental'}")
+    print_info(f"Fuso dos watermarks: {EXPORT_TIMEZONE}")
+    print()
+
+    # Mesmo snapshot para todas as tabelas
+    conn.rollback()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    start = time.time()
+
+    try:
+        # Horizonte: início da transação mais antiga ainda aberta. Linhas com
+        # watermark acima dele podem ser confirmadas depois deste snapshot com
+        # um valor anterior ao maior exportado, então o watermark salvo não
+        # passa do horizonte e essa janela é relida na próxima execução
+        # (descartando os pares id/watermark já exportados). A conversão usa
+        # EXPORT_TIMEZONE, não o fuso desta sessão.
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT LEAST(NOW(), MIN(xact_start)) AT TIME ZONE %s
+            FROM pg_stat_activity
+            WHERE datname = current_database()
+              AND pid <> pg_backend_pid()
+              AND xact_start IS NOT NULL
+        """, (EXPORT_TIMEZONE,))
+        horizon = cursor.fetchone()[0]
+        cursor.close()
+
+        for table in selected:
+            previous = None if full else state.get(table)
+            since = previous['watermark'] if previous else None
+            skip = previous['overlap'] if previous else []
+            table_start = time.time()
+            rows, max_watermark, recent = export_table(
+                conn, pa, table, EXPORT_TABLES[table], since, target_dir, file_format, chunk_size,
+                skip=skip, horizon=horizon
+            )
+
+            if not rows:
+                print_info(f"{table}: nada novo desde {since}")
+                continue
+
+            watermark = min(max_watermark, horizon) if max_watermark else since
+            if since and watermark and watermark < since:
+                watermark = since
+            overlap = {
+                (row_id, value) for row_id, value in skip + recent
+                if watermark is None or value > watermark
+            }
+            state[table] = {'watermark': watermark, 'overlap': sorted(overlap, key=lambda pair: pair[1])}
+            save_export_state(state_path, state)
+            print_success(f"{table}: {rows:,} registros ({time.time() - table_start:.2f}s)")
+
+        conn.rollback()
+    finally:
+        conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+
+    print()
+    print_success(f"Exportação concluída em {time.time() - start:.2f}s")
+
+def show_state(target_dir=EXPORT_DIR):
+    """Mostra o watermark salvo de cada tabela"""
+    print_header("ESTADO DA EXPORTAÇÃO")
+
+    state = load_export_state(os.path.join(target_dir, '_export_state.json'))
+    if not state:
+        print_warning(f"Nenhuma exportação em {target_dir} - rode 'run'")
+        return
+
+    for table in EXPORT_TABLES:
+        entry = state.get(table)
+        if entry:
+            print(f"  {table:20} {entry['watermark']}  ({len(entry['overlap'])} pares na janela relida)")
+        else:
+            print(f"  {table:20} {Colors.WARNING}nunca exportada{Colors.ENDC}")
+
+def main():
+    """Função principal"""
+    print_header("EXPORTAÇÃO PARA ANALYTICS")
+    print_info(f"Database: {DB_CONFIG['database']} @ {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    print()
+
+    if len(sys.argv) < 2:
+        print(f"{Colors.BOLD}Uso:{Colors.ENDC}")
+        print(f"  python {sys.argv[0]} <comando> [opções]")
+        print()
+        print(f"{Colors.BOLD}Comandos disponíveis:{Colors.ENDC}")
+        print(f"  run                - Exporta tabelas para Parquet/Arrow (incremental)")
+        print(f"      [--format=parquet|arrow] [--full] [--tables=a,b] [--chunk-size=50000] [--dir=PATH]")
+        print(f"  status             - Mostra o watermark de cada tabela [--dir=PATH]")
+        print()
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'status':
+        show_state(get_option('dir', EXPORT_DIR))
+        return
+
+    if command != 'run':
+        print_error(f"Comando desconhecido: {command}")
+        sys.exit(1)
+
+    file_format = get_option('format', 'parquet')
+    if file_format not in ('parquet', 'arrow'):
+        print_error(f"Formato inválido: {file_format}")
+        sys.exit(1)
+    selected = get_option('tables')
+
+    conn = get_connection()
+
+    try:
+        export_dataset(
+            conn,
+            target_dir=get_option('dir', EXPORT_DIR),
+            file_format=file_format,
+            full='--full' in sys.argv,
+            tables=[t.strip() for t in selected.split(',')] if selected else None,
+            chunk_size=int(get_option('chunk-size', '50000')),
+        )
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,28 @@ Database Import Script
 Importa dados da API VetCare para o banco de dados local
 """
 
+import io
 import os
 import sys
+import csv
+import json
 import time
+import random
+import signal
+import sqlite3
+import hashlib
+import threading
+import concurrent.futures
 import requests
 import psycopg2
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from psycopg2.extras import execute_values
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+from collections import deque
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+
+from db_cleanup import get_option
 
 # Configurações
 DB_CONFIG = {
@@ -23,6 +38,93 @@ DB_CONFIG = {
 
 API_BASE_URL = os.getenv('VETCARE_API_URL', 'https://vet.talkhub.me/api')
 
+# Rate limiting adaptativo (requisições por segundo)
+RATE_LIMIT_CONFIG = {
+    'initial_rate': float(os.getenv('API_RATE_INITIAL', '10')),
+    'min_rate': float(os.getenv('API_RATE_MIN', '1')),
+    'max_rate': float(os.getenv('API_RATE_MAX', '50')),
+    'p95_target': float(os.getenv('API_P95_TARGET', '1.0')),  # segundos
+    'error_threshold': float(os.getenv('API_ERROR_RATE_MAX', '0.05')),
+}
+
+# Novas tentativas em 429/5xx/timeout (aguardando Retry-After ou o slot já reduzido)
+API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '3'))
+
+# Cache local de respostas HTTP (endpoints por pet)
+CACHE_CONFIG = {
+    'path': os.getenv('IMPORT_CACHE_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '.cache', 'http_cache.sqlite'
+    )),
+    'max_age_days': int(os.getenv('IMPORT_CACHE_MAX_AGE_DAYS', '30')),
+    'max_size_mb': int(os.getenv('IMPORT_CACHE_MAX_MB', '200')),
+}
+
+# Change feed: canal do pg_notify emitido ao final de cada importação
+CHANGE_FEED_CHANNEL = 'vetcare_changes'
+
+# Criadas pelo database_schema_optimized.sql / add_missing_columns.sql; aqui só
+# como garantia para bancos que ainda não receberam a migração
+CHANGE_FEED_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS import_batches (
+      id BIGSERIAL PRIMARY KEY,
+      started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      finished_at TIMESTAMP,
+      changes JSONB,
+      error TEXT  -- preenchido quando a importação foi interrompida
+    );
+
+    ALTER TABLE import_batches ADD COLUMN IF NOT EXISTS error TEXT;
+
+    CREATE TABLE IF NOT EXISTS import_change_log (
+      batch_id BIGINT NOT NULL REFERENCES import_batches(id) ON DELETE CASCADE,
+      entity VARCHAR(20) NOT NULL,
+      entity_id INTEGER NOT NULL,
+      pet_id INTEGER,
+      operation CHAR(1) NOT NULL,  -- I = inserido, U = alterado, D = removido na origem
+      PRIMARY KEY (batch_id, entity, entity_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_import_change_log_pet_id ON import_change_log(pet_id);
+"""
+
+# Reconciliação de remoções na origem
+RECONCILE_CONFIG = {
+    # Aborta a tabela se mais que esta fração dos registros ativos sumiria de uma vez
+    'max_ratio': float(os.getenv('IMPORT_RECONCILE_MAX_RATIO', '0.2')),
+    'min_rows': int(os.getenv('IMPORT_RECONCILE_MIN_ROWS', '10')),  # sempre permitido
+}
+
+# entidade -> (tabela, colunas da chave na API, coluna com o pet)
+RECONCILE_TABLES = {
+    'customers': ('customers', [('id', 'INTEGER')], None),
+    'pets': ('pets', [('id', 'INTEGER')], 'id'),
+    'vaccines': ('vaccines', [('pet_id', 'INTEGER'), ('vaccine_name', 'TEXT'),
+                              ('application_date', 'TIMESTAMP')], 'pet_id'),
+    'grooming': ('grooming_services', [('pet_id', 'INTEGER'), ('service_date', 'DATE')], 'pet_id'),
+    'appointments': ('appointments', [('id', 'INTEGER')], 'pet_id'),
+}
+
+# Importação de várias clínicas (--tenants=arquivo.json)
+TENANTS_CONFIG = {
+    'max_concurrency': int(os.getenv('IMPORT_MAX_CONCURRENCY', '3')),  # clínicas simultâneas
+    'log_dir': os.getenv('IMPORT_TENANT_LOG_DIR', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'logs'
+    )),
+}
+
+# Modo daemon (--daemon)
+DAEMON_CONFIG = {
+    'interval': int(os.getenv('IMPORT_DAEMON_INTERVAL', '300')),  # segundos entre ciclos
+    'jitter': float(os.getenv('IMPORT_DAEMON_JITTER', '0.1')),  # fração aleatória do intervalo
+    'health_port': int(os.getenv('IMPORT_DAEMON_HEALTH_PORT', '8787')),
+}
+
+class FetchError(Exception):
+    """Listagem principal da API indisponível (URL, credenciais, timeout após as tentativas)"""
+
+class ImportInterrupted(Exception):
+    """Daemon recebeu SIGTERM/SIGINT no meio de um ciclo"""
+
 # Cores para output
 class Colors:
     HEADER = '\033[95m'
@@ -51,35 +153,302 @@ def print_error(message):
 def print_info(message):
     print(f"{Colors.OKCYAN}ℹ {message}{Colors.ENDC}")
 
-def print_progress(current, total, entity):
+def print_progress(current, total, entity, rate=None):
+    if not getattr(sys.stdout, 'show_progress', True):
+        return
     percent = (current / total * 100) if total > 0 else 0
     bar_length = 40
     filled = int(bar_length * current // total) if total > 0 else 0
     bar = '█' * filled + '░' * (bar_length - filled)
-    print(f"\r{Colors.OKCYAN}[{bar}] {percent:6.2f}% ({current}/{total}) {entity}{Colors.ENDC}", end='', flush=True)
+    rate_info = f" | {rate:5.1f} req/s" if rate is not None else ''
+    print(f"\r{Colors.OKCYAN}[{bar}] {percent:6.2f}% ({current}/{total}) {entity}{rate_info}{Colors.ENDC}", end='', flush=True)
+
+class AdaptiveRateLimiter:
+    """
+    Rate limiter AIMD alimentado pela latência e erros observados na API.
+
+    Aumenta a taxa aos poucos enquanto o p95 de latência e a taxa de erro
+    ficam abaixo dos limites, e corta pela metade em 429/5xx/timeouts.
+    """
+
+    def __init__(self, initial_rate: float, min_rate: float, max_rate: float,
+                 p95_target: float, error_threshold: float,
+                 window: int = 50, increase_step: float = 1.0,
+                 decrease_factor: float = 0.5, cooldown: float = 1.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.p95_target = p95_target
+        self.error_threshold = error_threshold
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.samples = deque(maxlen=window)  # (latência, sucesso)
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+        self.last_decrease = 0.0
+        self.metrics = {'requests': 0, 'throttled': 0, 'errors': 0, 'decreases': 0}
+
+    def acquire(self):
+        """Bloqueia até o próximo slot liberado pela taxa atual"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.rate
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, latency: float, status: Optional[int] = None,
+               error: bool = False, retry_after: Optional[float] = None):
+        """Registra o resultado de uma requisição e ajusta a taxa"""
+        throttled = status == 429 or (status is not None and status >= 500)
+
+        with self.lock:
+            now = time.monotonic()
+            self.metrics['requests'] += 1
+            self.samples.append((latency, not (throttled or error)))
+
+            if throttled or error:
+                self.metrics['throttled' if throttled else 'errors'] += 1
+                self._decrease(now)
+                if retry_after:
+                    self.next_slot = max(self.next_slot, now + retry_after)
+                return
+
+            p95 = self._p95()
+            if p95 is not None and p95 > self.p95_target:
+                # Latência subindo sem erros: recuo suave
+                self._decrease(now, factor=0.9)
+            elif self._error_rate() <= self.error_threshold:
+                # Aumento aditivo: ~increase_step req/s a cada segundo saudável
+                self.rate = min(self.max_rate, self.rate + self.increase_step / self.rate)
+
+    def _decrease(self, now: float, factor: Optional[float] = None):
+        """Redução multiplicativa, no máximo uma vez por cooldown"""
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.rate = max(self.min_rate, self.rate * (factor or self.decrease_factor))
+        self.next_slot = max(self.next_slot, now + 1.0 / self.rate)
+        self.last_decrease = now
+        self.metrics['decreases'] += 1
+
+    def _p95(self) -> Optional[float]:
+        if len(self.samples) < 10:
+            return None
+        latencies = sorted(latency for latency, _ in self.samples)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def _error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas atuais do limiter"""
+        with self.lock:
+            return {
+                'rate': round(self.rate, 2),
+                'p95_latency': self._p95(),
+                'error_rate': round(self._error_rate(), 4),
+                **self.metrics,
+            }
+
+class ResponseCache:
+    """
+    Cache em disco (SQLite) de respostas da API, indexado pela URL.
+
+    Guarda ETag/Last-Modified e o hash do corpo para permitir requisições
+    condicionais e detectar respostas idênticas às da execução anterior.
+    """
+
+    def __init__(self, path: str, max_age_days: int, max_size_mb: int):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.max_size = max_size_mb * 1024 * 1024
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_accessed_at ON http_cache(accessed_at)")
+        self.db.commit()
+        self.inode = os.stat(path).st_ino
+
+    def is_stale(self) -> bool:
+        """True se o arquivo foi removido/substituído (ex.: db_cleanup.py clean)"""
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return True
+
+    def clear(self):
+        self.db.execute("DELETE FROM http_cache")
+        self.db.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada do cache para a URL (ou None)"""
+        row = self.db.execute(
+            "SELECT etag, last_modified, body_hash, body FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'body_hash': row[2], 'body': row[3]}
+
+    def store_many(self, entries: List[Tuple]):
+        """Grava entradas (url, etag, last_modified, body_hash, body)"""
+        now = time.time()
+        self.db.executemany("""
+            INSERT INTO http_cache (url, etag, last_modified, body_hash, body, size, stored_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                body_hash = excluded.body_hash,
+                body = excluded.body,
+                size = excluded.size,
+                stored_at = excluded.stored_at,
+                accessed_at = excluded.accessed_at
+        """, [(url, etag, last_modified, body_hash, body, len(body), now, now)
+              for url, etag, last_modified, body_hash, body in entries])
+        self.db.commit()
+
+    def evict(self) -> int:
+        """Remove entradas antigas e as menos usadas até caber no limite de tamanho"""
+        removed = self.db.execute(
+            "DELETE FROM http_cache WHERE stored_at < ?", (time.time() - self.max_age,)
+        ).rowcount
+
+        total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total_size > self.max_size:
+            excess = total_size - self.max_size
+            stale = []
+            for url, size in self.db.execute("SELECT url, size FROM http_cache ORDER BY accessed_at"):
+                if excess <= 0:
+                    break
+                stale.append((url,))
+                excess -= size
+            self.db.executemany("DELETE FROM http_cache WHERE url = ?", stale)
+            removed += len(stale)
+
+        self.db.commit()
+        return removed
+
+    def close(self):
+        self.db.close()
+
+class TenantOutput:
+    """
+    Substitui sys.stdout durante a importação de várias clínicas: o que cada
+    thread imprime vai para o log da sua clínica, sem barras de progresso.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def route(self, log_file):
+        self.local.file = log_file
+
+    @property
+    def target(self):
+        return getattr(self.local, 'file', None) or self.stream
+
+    @property
+    def show_progress(self) -> bool:
+        return self.target is self.stream
+
+    def write(self, text):
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+    def isatty(self) -> bool:
+        return self.show_progress and self.stream.isatty()
 
 class VetCareImporter:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, refresh_cache: bool = False, maintain: bool = False,
+                 reconcile: bool = True, force_reconcile: bool = False,
+                 api_url: str = API_BASE_URL, db_config: Optional[Dict] = None,
+                 headers: Optional[Dict] = None, rate_limit: Optional[Dict] = None,
+                 cache_path: Optional[str] = None, name: Optional[str] = None):
+        self.name = name  # Clínica (modo --tenants)
+        self.api_url = api_url
+        self.db_config = db_config or DB_CONFIG
         self.conn = None
         self.cursor = None
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.rate_limiter = AdaptiveRateLimiter(**{**RATE_LIMIT_CONFIG, **(rate_limit or {})})
+        self.cache = ResponseCache(**{**CACHE_CONFIG, 'path': cache_path or CACHE_CONFIG['path']}) if use_cache else None
+        self.refresh_cache = refresh_cache
+        self.pending_cache = []  # Gravadas no cache só após o commit no banco
+        self.cache_stats = {'not_modified': 0, 'same_hash': 0, 'changed': 0}
+        self.maintain = maintain  # ANALYZE/VACUUM ao final da importação
+        self.reconcile_deletes = reconcile
+        self.force_reconcile = force_reconcile  # ignora o limite de RECONCILE_CONFIG
+        self.last_error = None
+        self.reset_stats()
+
+        # Índice em memória (id -> hash) dos registros já persistidos.
+        # Só tem efeito no modo daemon, onde sobrevive entre os ciclos.
+        self.record_hashes = {'customers': {}, 'pets': {}, 'appointments': {}}
+        self.pending_hashes = []
+
+        # Change feed: ids que realmente mudaram nesta importação
+        self.batch_id = None
+        self.pending_changes = []
+        self.change_counts = {}
+
+        # Chaves vistas na API nesta importação (None = busca incompleta).
+        # Vacinas e fichas só são reconciliadas nos pets buscados com sucesso.
+        self.upstream_keys = {}
+        self.upstream_pets = {}
+
+        self.stop_event = threading.Event()
+        self.daemon_state = {
+            'cycles': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'last_started': None,
+            'last_finished': None,
+            'last_duration': None,
+            'last_error': None,
+        }
+
+    def reset_stats(self):
+        """Zera as estatísticas (a cada ciclo no modo daemon)"""
         self.stats = {
-            'customers': {'synced': 0, 'errors': 0},
-            'pets': {'synced': 0, 'errors': 0},
-            'vaccines': {'synced': 0, 'errors': 0},
-            'grooming': {'synced': 0, 'errors': 0},
-            'appointments': {'synced': 0, 'errors': 0},
+            'customers': {'synced': 0, 'errors': 0, 'unchanged': 0, 'removed': 0},
+            'pets': {'synced': 0, 'errors': 0, 'unchanged': 0, 'removed': 0},
+            'vaccines': {'synced': 0, 'errors': 0, 'removed': 0},
+            'grooming': {'synced': 0, 'errors': 0, 'removed': 0},
+            'appointments': {'synced': 0, 'errors': 0, 'unchanged': 0, 'removed': 0},
         }
+        self.fetch_errors = []  # Listagens principais que falharam (/clientes, /pets, /agendamentos)
 
-    def connect_db(self):
+    def connect_db(self, exit_on_error: bool = True):
         """Conecta ao banco de dados"""
         try:
-            self.conn = psycopg2.connect(**DB_CONFIG)
+            self.conn = psycopg2.connect(**self.db_config)
             self.conn.autocommit = False
             self.cursor = self.conn.cursor()
             print_success("Conectado ao banco de dados")
         except Exception as e:
             print_error(f"Erro ao conectar ao banco: {e}")
-            sys.exit(1)
+            if exit_on_error:
+                sys.exit(1)
+            raise
 
     def close_db(self):
         """Fecha conexão com o banco"""
@@ -87,19 +456,246 @@ class VetCareImporter:
             self.cursor.close()
         if self.conn:
             self.conn.close()
+        self.session.close()
+        if self.cache:
+            self.cache.close()
         print_info("Conexão com banco fechada")
 
+    def commit(self):
+        """Commit no banco e grava no cache as respostas já persistidas"""
+        if self.conn.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+            # conn.commit() numa transação abortada faz rollback em silêncio:
+            # nada do que está pendente pode ir para o change log, cache ou índice
+            print_warning("Transação abortada - lote descartado")
+            self.rollback()
+            return
+        recorded = []
+        if self.pending_changes:
+            # Mesma transação dos dados: o change log nunca diverge do banco.
+            # Conta só o que foi gravado: o mesmo registro repetido na resposta
+            # (ou já registrado no lote) cai no ON CONFLICT e não conta de novo.
+            recorded = execute_values(self.cursor, """
+                INSERT INTO import_change_log (batch_id, entity, entity_id, pet_id, operation)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING entity
+            """, [(self.batch_id, *change) for change in self.pending_changes], fetch=True)
+        self.conn.commit()
+        for (entity,) in recorded:
+            self.change_counts[entity] = self.change_counts.get(entity, 0) + 1
+        self.pending_changes = []
+        if self.cache and self.pending_cache:
+            self.cache.store_many(self.pending_cache)
+        self.pending_cache = []
+        for entity, record_id, digest in self.pending_hashes:
+            self.record_hashes[entity][record_id] = digest
+        self.pending_hashes = []
+
+    def rollback(self):
+        """Rollback no banco descartando cache e hashes pendentes"""
+        self.pending_cache = []
+        self.pending_hashes = []
+        self.pending_changes = []
+        if self.conn and not self.conn.closed:
+            self.conn.rollback()
+
+    def execute_row(self, query: str, params: Tuple) -> Optional[Tuple]:
+        """
+        UPSERT de um registro dentro de um SAVEPOINT: um registro inválido
+        (ex.: CPF maior que a coluna) perde só a si mesmo, não o lote inteiro.
+        Retorna a linha do RETURNING (ou None).
+        """
+        self.cursor.execute("SAVEPOINT row_upsert")
+        try:
+            self.cursor.execute(query, params)
+        except Exception:
+            self.cursor.execute("ROLLBACK TO SAVEPOINT row_upsert")
+            raise
+        row = self.cursor.fetchone()
+        self.cursor.execute("RELEASE SAVEPOINT row_upsert")
+        return row
+
+    def record_change(self, entity: str, row: Optional[Tuple], pet_id_index: Optional[int] = None):
+        """
+        Registra o RETURNING do UPSERT. Só há linha quando o registro foi
+        inserido ou teve algum valor alterado (ON CONFLICT ... WHERE DISTINCT).
+        """
+        if row:
+            entity_id, inserted = row[0], row[-1]
+            pet_id = row[pet_id_index] if pet_id_index is not None else None
+            self.pending_changes.append((entity, entity_id, pet_id, 'I' if inserted else 'U'))
+
+    def begin_batch(self):
+        """Registra o início de um lote de importação no change feed"""
+        from db_cleanup import ensure_future_partitions
+        ensure_future_partitions(self.conn)
+
+        self.cursor.execute(CHANGE_FEED_SCHEMA)
+        self.ensure_removed_column()
+        self.cursor.execute("INSERT INTO import_batches DEFAULT VALUES RETURNING id")
+        self.batch_id = self.cursor.fetchone()[0]
+        self.change_counts = {}
+        self.upstream_keys = {entity: None for entity in RECONCILE_TABLES}
+        self.upstream_pets = {'vaccines': set(), 'grooming': set()}
+        self.conn.commit()
+        print_info(f"Lote de importação #{self.batch_id}")
+
+    def finish_batch(self, error: Optional[str] = None):
+        """Fecha o lote e avisa os consumidores via pg_notify"""
+        self.cursor.execute("""
+            UPDATE import_batches SET finished_at = NOW(), changes = %s, error = %s
+            WHERE id = %s AND finished_at IS NULL
+        """, (json.dumps(self.change_counts), error, self.batch_id))
+        if self.cursor.rowcount == 0:
+            self.conn.commit()  # Já fechado
+            return
+
+        if self.change_counts:
+            message = {'batch_id': self.batch_id, 'changes': self.change_counts}
+            if self.name:
+                message['tenant'] = self.name
+            if error:
+                message['failed'] = True
+            payload = json.dumps(message)
+            self.cursor.execute("SELECT pg_notify(%s, %s)", (CHANGE_FEED_CHANNEL, payload))
+        self.conn.commit()
+
+        total = sum(self.change_counts.values())
+        print_info(f"Change feed: lote #{self.batch_id} com {total:,} alterações {self.change_counts or ''}")
+
+    def abort_batch(self, error: BaseException):
+        """
+        Fecha como falho o lote de uma importação interrompida, anunciando as
+        alterações que já foram commitadas até o erro
+        """
+        if self.batch_id is None or self.conn is None or self.conn.closed:
+            return
+        try:
+            self.finish_batch(error=str(error) or type(error).__name__)
+        except psycopg2.Error as e:
+            print_warning(f"Não foi possível fechar o lote #{self.batch_id}: {e}")
+            try:
+                self.rollback()
+            except psycopg2.Error:
+                pass
+
+    def ensure_removed_column(self):
+        """Cria removed_upstream_at em bancos anteriores à reconciliação"""
+        tables = [table for table, _, _ in RECONCILE_TABLES.values()]
+        self.cursor.execute("""
+            SELECT t.table_name FROM information_schema.tables t
+            WHERE t.table_schema = current_schema() AND t.table_name = ANY(%s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM information_schema.columns c
+                  WHERE c.table_schema = t.table_schema AND c.table_name = t.table_name
+                    AND c.column_name = 'removed_upstream_at'
+              )
+        """, (tables,))
+        for (table,) in self.cursor.fetchall():
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS removed_upstream_at TIMESTAMP")
+            print_info(f"Coluna removed_upstream_at criada em {table}")
+
+    def check_stop(self):
+        """Interrompe o ciclo assim que o daemon recebe sinal de parada"""
+        if self.stop_event.is_set():
+            raise ImportInterrupted("parada solicitada")
+
+    def record_digest(self, record: Dict) -> bytes:
+        return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode()).digest()
+
+    def http_get(self, endpoint: str, params: Optional[Dict] = None,
+                 headers: Optional[Dict] = None) -> Optional[requests.Response]:
+        """
+        GET na API VetCare com rate limiting adaptativo. Respostas 429/5xx e
+        falhas de rede são repetidas até API_MAX_RETRIES vezes: o limiter já
+        reduziu a taxa e respeita o Retry-After antes do próximo slot.
+        """
+        url = f"{self.api_url}{endpoint}"
+
+        for attempt in range(API_MAX_RETRIES + 1):
+            last_attempt = attempt == API_MAX_RETRIES
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=30)
+            except requests.exceptions.RequestException as e:
+                self.rate_limiter.record(time.monotonic() - start, error=True)
+                if last_attempt:
+                    print_error(f"Erro na API {endpoint} após {attempt + 1} tentativas: {e}")
+                    return None
+                continue
+
+            retry_after = response.headers.get('Retry-After')
+            self.rate_limiter.record(
+                time.monotonic() - start,
+                status=response.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+            if response.status_code == 429 or response.status_code >= 500:
+                if not last_attempt:
+                    continue
+            return response
+
     def api_get(self, endpoint: str, params: Optional[Dict] = None) -> Any:
         """Faz requisição GET na API VetCare"""
+        response = self.http_get(endpoint, params)
+        if response is None:
+            return None
+
         try:
-            url = f"{API_BASE_URL}{endpoint}"
-            response = requests.get(url, params=params, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print_error(f"Erro na API {endpoint}: {e}")
             return None
 
+    def api_get_cached(self, endpoint: str) -> Tuple[Any, bool, Optional[Tuple]]:
+        """
+        GET condicional usando o cache local.
+        Retorna (dados, mudou, entrada) - mudou=False quando a resposta é idêntica à
+        última persistida. A entrada só deve ir para pending_cache depois que todos
+        os registros da resposta forem gravados.
+        """
+        if not self.cache:
+            return self.api_get(endpoint), True, None
+
+        url = f"{self.api_url}{endpoint}"
+        entry = None if self.refresh_cache else self.cache.get(url)
+
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.http_get(endpoint, headers=headers)
+        if response is None:
+            return None, True, None
+
+        if response.status_code == 304 and entry:
+            self.cache_stats['not_modified'] += 1
+            cache_entry = (url, entry['etag'], entry['last_modified'], entry['body_hash'], entry['body'])
+            return json.loads(entry['body']), False, cache_entry
+
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            print_error(f"Erro na API {endpoint}: {e}")
+            return None, True, None
+
+        body = response.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        cache_entry = (url, response.headers.get('ETag'), response.headers.get('Last-Modified'), body_hash, body)
+
+        if entry and entry['body_hash'] == body_hash:
+            self.cache_stats['same_hash'] += 1
+            return data, False, cache_entry
+
+        self.cache_stats['changed'] += 1
+        return data, True, cache_entry
+
     def parse_date(self, date_str: str, format: str = '%Y-%m-%d') -> Optional[str]:
         """Parseia data em diversos formatos"""
         if not date_str:
@@ -118,70 +714,124 @@ class VetCareImporter:
 
         return None
 
+    def collect_vaccine_keys(self, pet_id: int, data: Any):
+        """
+        Guarda as chaves (pet_id, vacina, data de aplicação) da resposta, inclusive
+        vinda do cache. Pets com resposta inválida ficam fora da reconciliação.
+        """
+        if not isinstance(data, list):
+            return
+        keys = set()
+        for vaccine in data:
+            vaccine_name = vaccine.get('vacina', {}).get('nome') or vaccine.get('vacina_nome')
+            if not vaccine_name:
+                continue
+            try:
+                application_date = datetime.fromisoformat(str(vaccine.get('data_aplicacao')))
+            except ValueError:
+                return
+            keys.add((pet_id, vaccine_name, application_date.isoformat(sep=' ')))
+        self.upstream_keys['vaccines'] |= keys
+        self.upstream_pets['vaccines'].add(pet_id)
+
+    def collect_grooming_keys(self, pet_id: int, data: Any):
+        """Guarda as chaves (pet_id, data do serviço) das fichas de banho do pet"""
+        if not isinstance(data, list):
+            return
+        keys = set()
+        for record in data:
+            try:
+                service_date = date.fromisoformat(self.parse_date(record.get('data')) or '')
+            except ValueError:
+                return
+            keys.add((pet_id, service_date.isoformat()))
+        self.upstream_keys['grooming'] |= keys
+        self.upstream_pets['grooming'].add(pet_id)
+
     def import_customers(self):
         """Importa clientes"""
         print_header("IMPORTANDO CLIENTES")
 
         data = self.api_get('/clientes')
-        if not data or not isinstance(data, list):
+        if not isinstance(data, list):
             print_error("Erro ao buscar clientes")
+            self.fetch_errors.append('/clientes')
+            return
+        if not data:
+            print_warning("Nenhum cliente retornado pela API")
             return
 
+        self.upstream_keys['customers'] = {(c['id'],) for c in data if c.get('id') is not None}
         total = len(data)
         print_info(f"Total de clientes a importar: {total:,}")
         print()
 
         for i, customer in enumerate(data, 1):
+            self.check_stop()
             try:
-                self.cursor.execute("""
-                    INSERT INTO customers (
-                        id, name, phone, whatsapp, email, cpf, rg,
-                        address, numero, complemento, bairro, city, state, cep,
-                        data_nascimento, observacoes, saldo_devedor, ativo
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        phone = EXCLUDED.phone,
-                        whatsapp = EXCLUDED.whatsapp,
-                        email = EXCLUDED.email,
-                        cpf = EXCLUDED.cpf,
-                        city = EXCLUDED.city,
-                        state = EXCLUDED.state,
-                        updated_at = NOW()
-                """, (
-                    customer.get('id'),
-                    customer.get('nome'),
-                    customer.get('telefone'),
-                    customer.get('whatsapp'),
-                    customer.get('email'),
-                    customer.get('cpf'),
-                    customer.get('rg'),
-                    customer.get('endereco'),
-                    customer.get('numero'),
-                    customer.get('complemento'),
-                    customer.get('bairro'),
-                    customer.get('cidade'),
-                    customer.get('estado'),
-                    customer.get('cep'),
-                    self.parse_date(customer.get('data_nascimento')) if customer.get('data_nascimento') else None,
-                    customer.get('observacoes'),
-                    customer.get('saldo_devedor', 0),
-                    customer.get('ativo', True),
-                ))
-
-                self.stats['customers']['synced'] += 1
+                digest = self.record_digest(customer)
+                if self.record_hashes['customers'].get(customer.get('id')) == digest:
+                    # Igual ao persistido em um ciclo anterior (modo daemon)
+                    self.stats['customers']['unchanged'] += 1
+                else:
+                    row = self.execute_row("""
+                        INSERT INTO customers (
+                            id, name, phone, whatsapp, email, cpf, rg,
+                            address, numero, complemento, bairro, city, state, cep,
+                            data_nascimento, observacoes, saldo_devedor, ativo
+                        ) VALUES (
+                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                        )
+                        ON CONFLICT (id) DO UPDATE SET
+                            name = EXCLUDED.name,
+                            phone = EXCLUDED.phone,
+                            whatsapp = EXCLUDED.whatsapp,
+                            email = EXCLUDED.email,
+                            cpf = EXCLUDED.cpf,
+                            city = EXCLUDED.city,
+                            state = EXCLUDED.state,
+                            removed_upstream_at = NULL,
+                            updated_at = NOW()
+                        WHERE (customers.name, customers.phone, customers.whatsapp, customers.email,
+                               customers.cpf, customers.city, customers.state)
+                            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.phone, EXCLUDED.whatsapp, EXCLUDED.email,
+                                              EXCLUDED.cpf, EXCLUDED.city, EXCLUDED.state)
+                            OR customers.removed_upstream_at IS NOT NULL
+                        RETURNING id, (xmax = 0) AS inserted
+                    """, (
+                        customer.get('id'),
+                        customer.get('nome'),
+                        customer.get('telefone'),
+                        customer.get('whatsapp'),
+                        customer.get('email'),
+                        customer.get('cpf'),
+                        customer.get('rg'),
+                        customer.get('endereco'),
+                        customer.get('numero'),
+                        customer.get('complemento'),
+                        customer.get('bairro'),
+                        customer.get('cidade'),
+                        customer.get('estado'),
+                        customer.get('cep'),
+                        self.parse_date(customer.get('data_nascimento')) if customer.get('data_nascimento') else None,
+                        customer.get('observacoes'),
+                        customer.get('saldo_devedor', 0),
+                        customer.get('ativo', True),
+                    ))
+                    self.record_change('customers', row)
+
+                    self.pending_hashes.append(('customers', customer.get('id'), digest))
+                    self.stats['customers']['synced'] += 1
 
                 if i % 100 == 0:
-                    self.conn.commit()
+                    self.commit()
                     print_progress(i, total, 'clientes')
 
             except Exception as e:
                 print_error(f"\nErro ao importar cliente {customer.get('id')}: {e}")
                 self.stats['customers']['errors'] += 1
 
-        self.conn.commit()
+        self.commit()
         print_progress(total, total, 'clientes')
         print()
         print_success(f"Clientes importados: {self.stats['customers']['synced']:,}")
@@ -193,8 +843,9 @@ class VetCareImporter:
         print_header("IMPORTANDO PETS")
 
         data = self.api_get('/pets')
-        if not data:
+        if data is None:
             print_error("Erro ao buscar pets")
+            self.fetch_errors.append('/pets')
             return
 
         # API retorna { data: [...] }
@@ -202,13 +853,16 @@ class VetCareImporter:
 
         if not isinstance(pets_data, list):
             print_error("Formato de dados inválido")
+            self.fetch_errors.append('/pets')
             return
 
+        self.upstream_keys['pets'] = {(p['id'],) for p in pets_data if p.get('id') is not None}
         total = len(pets_data)
         print_info(f"Total de pets a importar: {total:,}")
         print()
 
         for i, pet in enumerate(pets_data, 1):
+            self.check_stop()
             try:
                 cliente_id = pet.get('cliente_id') or pet.get('cliente', {}).get('id')
 
@@ -216,49 +870,61 @@ class VetCareImporter:
                     self.stats['pets']['errors'] += 1
                     continue
 
-                self.cursor.execute("""
-                    INSERT INTO pets (
-                        id, customer_id, name, species, breed, gender, castrado,
-                        birth_date, weight, color, microchip, foto, alergias,
-                        observacoes, ativo
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        species = EXCLUDED.species,
-                        breed = EXCLUDED.breed,
-                        weight = EXCLUDED.weight,
-                        updated_at = NOW()
-                """, (
-                    pet.get('id'),
-                    cliente_id,
-                    pet.get('nome'),
-                    pet.get('especie'),
-                    pet.get('raca'),
-                    pet.get('sexo'),
-                    pet.get('castrado', False),
-                    self.parse_date(pet.get('data_nascimento')) if pet.get('data_nascimento') else None,
-                    pet.get('peso'),
-                    pet.get('pelagem'),
-                    pet.get('microchip'),
-                    pet.get('foto'),
-                    pet.get('alergias'),
-                    pet.get('observacoes'),
-                    pet.get('ativo', True),
-                ))
-
-                self.stats['pets']['synced'] += 1
+                digest = self.record_digest(pet)
+                if self.record_hashes['pets'].get(pet.get('id')) == digest:
+                    # Igual ao persistido em um ciclo anterior (modo daemon)
+                    self.stats['pets']['unchanged'] += 1
+                else:
+                    row = self.execute_row("""
+                        INSERT INTO pets (
+                            id, customer_id, name, species, breed, gender, castrado,
+                            birth_date, weight, color, microchip, foto, alergias,
+                            observacoes, ativo
+                        ) VALUES (
+                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                        )
+                        ON CONFLICT (id) DO UPDATE SET
+                            name = EXCLUDED.name,
+                            species = EXCLUDED.species,
+                            breed = EXCLUDED.breed,
+                            weight = EXCLUDED.weight,
+                            removed_upstream_at = NULL,
+                            updated_at = NOW()
+                        WHERE (pets.name, pets.species, pets.breed, pets.weight)
+                            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.species, EXCLUDED.breed, EXCLUDED.weight)
+                            OR pets.removed_upstream_at IS NOT NULL
+                        RETURNING id, id AS pet_id, (xmax = 0) AS inserted
+                    """, (
+                        pet.get('id'),
+                        cliente_id,
+                        pet.get('nome'),
+                        pet.get('especie'),
+                        pet.get('raca'),
+                        pet.get('sexo'),
+                        pet.get('castrado', False),
+                        self.parse_date(pet.get('data_nascimento')) if pet.get('data_nascimento') else None,
+                        pet.get('peso'),
+                        pet.get('pelagem'),
+                        pet.get('microchip'),
+                        pet.get('foto'),
+                        pet.get('alergias'),
+                        pet.get('observacoes'),
+                        pet.get('ativo', True),
+                    ))
+                    self.record_change('pets', row, pet_id_index=1)
+
+                    self.pending_hashes.append(('pets', pet.get('id'), digest))
+                    self.stats['pets']['synced'] += 1
 
                 if i % 50 == 0:
-                    self.conn.commit()
+                    self.commit()
                     print_progress(i, total, 'pets')
 
             except Exception as e:
                 print_error(f"\nErro ao importar pet {pet.get('id')}: {e}")
                 self.stats['pets']['errors'] += 1
 
-        self.conn.commit()
+        self.commit()
         print_progress(total, total, 'pets')
         print()
         print_success(f"Pets importados: {self.stats['pets']['synced']:,}")
@@ -269,8 +935,8 @@ class VetCareImporter:
         """Importa vacinas de todos os pets"""
         print_header("IMPORTANDO VACINAS")
 
-        # Buscar pets do banco
-        self.cursor.execute("SELECT id FROM pets")
+        # Buscar pets do banco (removidos na origem não têm mais o que buscar)
+        self.cursor.execute("SELECT id FROM pets WHERE removed_upstream_at IS NULL")
         pet_ids = [row[0] for row in self.cursor.fetchall()]
 
         total = len(pet_ids)
@@ -279,13 +945,22 @@ class VetCareImporter:
 
         vaccines_imported = 0
         vaccines_errors = 0
+        pets_unchanged = 0
+        self.upstream_keys['vaccines'] = set()
 
         for i, pet_id in enumerate(pet_ids, 1):
+            self.check_stop()
             try:
-                data = self.api_get(f'/pets/{pet_id}/vacinacoes')
+                data, changed, cache_entry = self.api_get_cached(f'/pets/{pet_id}/vacinacoes')
+                pet_errors = 0
+                self.collect_vaccine_keys(pet_id, data)
 
-                if not data or not isinstance(data, list):
-                    continue
+                if not changed:
+                    # Resposta idêntica à da última execução: pula a fase de banco
+                    pets_unchanged += 1
+
+                if not changed or not data or not isinstance(data, list):
+                    data = []
 
                 for vaccine in data:
                     try:
@@ -300,14 +975,18 @@ class VetCareImporter:
                             'anual', 'raiva', 'v8', 'v10', 'múltipla', 'multipla'
                         ])
 
-                        self.cursor.execute("""
+                        row = self.execute_row("""
                             INSERT INTO vaccines (
                                 pet_id, vacina_id, vaccine_name, veterinarian_id, veterinarian_name,
                                 application_date, next_dose_date, dose, batch_number, is_annual, observacoes
                             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                             ON CONFLICT (pet_id, vaccine_name, application_date) DO UPDATE SET
                                 next_dose_date = EXCLUDED.next_dose_date,
+                                removed_upstream_at = NULL,
                                 updated_at = NOW()
+                            WHERE vaccines.next_dose_date IS DISTINCT FROM EXCLUDED.next_dose_date
+                                OR vaccines.removed_upstream_at IS NOT NULL
+                            RETURNING id, pet_id, (xmax = 0) AS inserted
                         """, (
                             pet_id,
                             vaccine.get('vacina_id'),
@@ -321,25 +1000,31 @@ class VetCareImporter:
                             is_annual,
                             vaccine.get('observacoes'),
                         ))
+                        self.record_change('vaccines', row, pet_id_index=1)
 
                         vaccines_imported += 1
 
                     except Exception as e:
                         vaccines_errors += 1
+                        pet_errors += 1
 
-                if i % 10 == 0:
-                    self.conn.commit()
-                    print_progress(i, total, 'pets processados')
+                # Pet com registro não gravado fica fora do cache para ser refeito na próxima execução
+                if cache_entry and not pet_errors:
+                    self.pending_cache.append(cache_entry)
 
-                time.sleep(0.1)  # Rate limiting
+                if i % 10 == 0:
+                    self.commit()
+                    print_progress(i, total, 'pets processados', self.rate_limiter.rate)
 
             except Exception as e:
                 continue
 
-        self.conn.commit()
-        print_progress(total, total, 'pets processados')
+        self.commit()
+        print_progress(total, total, 'pets processados', self.rate_limiter.rate)
         print()
         print_success(f"Vacinas importadas: {vaccines_imported:,}")
+        if pets_unchanged > 0:
+            print_info(f"Pets sem alteração (cache): {pets_unchanged:,}")
         if vaccines_errors > 0:
             print_warning(f"Erros: {vaccines_errors}")
 
@@ -350,8 +1035,8 @@ class VetCareImporter:
         """Importa fichas de banho de todos os pets"""
         print_header("IMPORTANDO FICHAS DE BANHO")
 
-        # Buscar pets do banco
-        self.cursor.execute("SELECT id FROM pets")
+        # Buscar pets do banco (removidos na origem não têm mais o que buscar)
+        self.cursor.execute("SELECT id FROM pets WHERE removed_upstream_at IS NULL")
         pet_ids = [row[0] for row in self.cursor.fetchall()]
 
         total = len(pet_ids)
@@ -360,13 +1045,22 @@ class VetCareImporter:
 
         grooming_imported = 0
         grooming_errors = 0
+        pets_unchanged = 0
+        self.upstream_keys['grooming'] = set()
 
         for i, pet_id in enumerate(pet_ids, 1):
+            self.check_stop()
             try:
-                data = self.api_get(f'/pets/{pet_id}/fichas-banho')
+                data, changed, cache_entry = self.api_get_cached(f'/pets/{pet_id}/fichas-banho')
+                pet_errors = 0
+                self.collect_grooming_keys(pet_id, data)
 
-                if not data or not isinstance(data, list):
-                    continue
+                if not changed:
+                    # Resposta idêntica à da última execução: pula a fase de banco
+                    pets_unchanged += 1
+
+                if not changed or not data or not isinstance(data, list):
+                    data = []
 
                 for record in data:
                     try:
@@ -382,14 +1076,18 @@ class VetCareImporter:
                         else:
                             service_type = 'banho'
 
-                        self.cursor.execute("""
+                        row = self.execute_row("""
                             INSERT INTO grooming_services (
                                 ficha_id, pet_id, service_date, retorno_date, service_type,
                                 servicos_detalhes, valor_total, funcionario_nome, observacoes
                             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                             ON CONFLICT (pet_id, service_date) DO UPDATE SET
                                 service_type = EXCLUDED.service_type,
+                                removed_upstream_at = NULL,
                                 updated_at = NOW()
+                            WHERE grooming_services.service_type IS DISTINCT FROM EXCLUDED.service_type
+                                OR grooming_services.removed_upstream_at IS NOT NULL
+                            RETURNING id, pet_id, (xmax = 0) AS inserted
                         """, (
                             record.get('id'),
                             pet_id,
@@ -401,25 +1099,31 @@ class VetCareImporter:
                             record.get('funcionario_nome'),
                             record.get('observacoes'),
                         ))
+                        self.record_change('grooming', row, pet_id_index=1)
 
                         grooming_imported += 1
 
                     except Exception as e:
                         grooming_errors += 1
+                        pet_errors += 1
 
-                if i % 10 == 0:
-                    self.conn.commit()
-                    print_progress(i, total, 'pets processados')
+                # Pet com registro não gravado fica fora do cache para ser refeito na próxima execução
+                if cache_entry and not pet_errors:
+                    self.pending_cache.append(cache_entry)
 
-                time.sleep(0.1)  # Rate limiting
+                if i % 10 == 0:
+                    self.commit()
+                    print_progress(i, total, 'pets processados', self.rate_limiter.rate)
 
             except Exception as e:
                 continue
 
-        self.conn.commit()
-        print_progress(total, total, 'pets processados')
+        self.commit()
+        print_progress(total, total, 'pets processados', self.rate_limiter.rate)
         print()
         print_success(f"Fichas de banho importadas: {grooming_imported:,}")
+        if pets_unchanged > 0:
+            print_info(f"Pets sem alteração (cache): {pets_unchanged:,}")
         if grooming_errors > 0:
             print_warning(f"Erros: {grooming_errors}")
 
@@ -431,15 +1135,21 @@ class VetCareImporter:
         print_header("IMPORTANDO AGENDAMENTOS")
 
         data = self.api_get('/agendamentos')
-        if not data or not isinstance(data, list):
+        if not isinstance(data, list):
             print_error("Erro ao buscar agendamentos")
+            self.fetch_errors.append('/agendamentos')
+            return
+        if not data:
+            print_warning("Nenhum agendamento retornado pela API")
             return
 
+        self.upstream_keys['appointments'] = {(a['id'],) for a in data if a.get('id') is not None}
         total = len(data)
         print_info(f"Total de agendamentos a importar: {total:,}")
         print()
 
         for i, appt in enumerate(data, 1):
+            self.check_stop()
             try:
                 # Mapear tipo
                 tipo = appt.get('tipo', '').lower()
@@ -467,47 +1177,136 @@ class VetCareImporter:
                 else:
                     status = 'agendado'
 
-                self.cursor.execute("""
-                    INSERT INTO appointments (
-                        id, cliente_id, pet_id, servico_id, veterinario_id,
-                        appointment_date, appointment_type, status, duracao_minutos,
-                        amount, observacoes, lembrete_enviado
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (id) DO UPDATE SET
-                        status = EXCLUDED.status,
-                        updated_at = NOW()
-                """, (
-                    appt.get('id'),
-                    appt.get('cliente_id'),
-                    appt.get('pet_id'),
-                    appt.get('servico_id'),
-                    appt.get('veterinario_id'),
-                    appt.get('data_hora'),
-                    appt_type,
-                    status,
-                    appt.get('duracao_minutos'),
-                    float(appt.get('valor', 0)) if appt.get('valor') else None,
-                    appt.get('observacoes'),
-                    appt.get('lembrete_enviado', False),
-                ))
-
-                self.stats['appointments']['synced'] += 1
+                digest = self.record_digest(appt)
+                if self.record_hashes['appointments'].get(appt.get('id')) == digest:
+                    # Igual ao persistido em um ciclo anterior (modo daemon)
+                    self.stats['appointments']['unchanged'] += 1
+                else:
+                    row = self.execute_row("""
+                        INSERT INTO appointments (
+                            id, cliente_id, pet_id, servico_id, veterinario_id,
+                            appointment_date, appointment_type, status, duracao_minutos,
+                            amount, observacoes, lembrete_enviado
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (id) DO UPDATE SET
+                            status = EXCLUDED.status,
+                            removed_upstream_at = NULL,
+                            updated_at = NOW()
+                        WHERE appointments.status IS DISTINCT FROM EXCLUDED.status
+                            OR appointments.removed_upstream_at IS NOT NULL
+                        RETURNING id, pet_id, (xmax = 0) AS inserted
+                    """, (
+                        appt.get('id'),
+                        appt.get('cliente_id'),
+                        appt.get('pet_id'),
+                        appt.get('servico_id'),
+                        appt.get('veterinario_id'),
+                        appt.get('data_hora'),
+                        appt_type,
+                        status,
+                        appt.get('duracao_minutos'),
+                        float(appt.get('valor', 0)) if appt.get('valor') else None,
+                        appt.get('observacoes'),
+                        appt.get('lembrete_enviado', False),
+                    ))
+                    self.record_change('appointments', row, pet_id_index=1)
+
+                    self.pending_hashes.append(('appointments', appt.get('id'), digest))
+                    self.stats['appointments']['synced'] += 1
 
                 if i % 100 == 0:
-                    self.conn.commit()
+                    self.commit()
                     print_progress(i, total, 'agendamentos')
 
             except Exception as e:
                 print_error(f"\nErro ao importar agendamento {appt.get('id')}: {e}")
                 self.stats['appointments']['errors'] += 1
 
-        self.conn.commit()
+        self.commit()
         print_progress(total, total, 'agendamentos')
         print()
         print_success(f"Agendamentos importados: {self.stats['appointments']['synced']:,}")
         if self.stats['appointments']['errors'] > 0:
             print_warning(f"Erros: {self.stats['appointments']['errors']}")
 
+    def copy_rows(self, table: str, columns: List[Tuple[str, str]], rows):
+        """Cria a tabela temporária e carrega as linhas via COPY (CSV)"""
+        definition = ', '.join(f"{name} {type_}" for name, type_ in columns)
+        self.cursor.execute(f"CREATE TEMP TABLE {table} ({definition}) ON COMMIT DROP")
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        self.cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+        self.cursor.execute(f"ANALYZE {table}")
+
+    def reconcile_table(self, entity: str, table: str, key_columns: List[Tuple[str, str]],
+                        pet_column: Optional[str]) -> int:
+        """
+        Marca removed_upstream_at nos registros locais ausentes da API com um
+        único UPDATE (anti-join contra a tabela temporária com as chaves).
+        """
+        upstream = f"upstream_{entity}"
+        self.copy_rows(upstream, key_columns, self.upstream_keys[entity])
+
+        scope = ''
+        if entity in self.upstream_pets:
+            self.copy_rows(f"{upstream}_pets", [('pet_id', 'INTEGER')],
+                           [(pet_id,) for pet_id in self.upstream_pets[entity]])
+            scope = f"AND t.pet_id IN (SELECT pet_id FROM {upstream}_pets)"
+
+        self.cursor.execute(f"SELECT COUNT(*) FROM {table} t WHERE t.removed_upstream_at IS NULL {scope}")
+        active = self.cursor.fetchone()[0]
+
+        match = ' AND '.join(f"u.{name} = t.{name}" for name, _ in key_columns)
+        self.cursor.execute("SAVEPOINT reconcile")
+        self.cursor.execute(f"""
+            UPDATE {table} t SET removed_upstream_at = NOW()
+            WHERE t.removed_upstream_at IS NULL {scope}
+              AND NOT EXISTS (SELECT 1 FROM {upstream} u WHERE {match})
+            RETURNING t.id, {f't.{pet_column}' if pet_column else 'NULL'}
+        """)
+        removed = self.cursor.fetchall()
+
+        limit = max(RECONCILE_CONFIG['min_rows'], int(active * RECONCILE_CONFIG['max_ratio']))
+        if len(removed) > limit and not self.force_reconcile:
+            self.cursor.execute("ROLLBACK TO SAVEPOINT reconcile")
+            self.commit()
+            print_warning(f"{table}: {len(removed):,} de {active:,} registros sumiram da API "
+                          f"(limite {limit:,}) - nada marcado, use --force-reconcile para confirmar")
+            return 0
+
+        self.pending_changes.extend((entity, entity_id, pet_id, 'D') for entity_id, pet_id in removed)
+        self.commit()
+
+        # Sem o hash em memória, o registro volta a ser gravado se reaparecer na API
+        hashes = self.record_hashes.get(entity, {})
+        for entity_id, _ in removed:
+            hashes.pop(entity_id, None)
+
+        sample = ', '.join(str(entity_id) for entity_id, _ in removed[:10])
+        more = '...' if len(removed) > 10 else ''
+        if removed:
+            print_success(f"{table}: {len(removed):,} de {active:,} marcados como removidos na origem "
+                          f"(ids {sample}{more})")
+        else:
+            print_info(f"{table}: nenhum registro removido na origem ({active:,} ativos)")
+        return len(removed)
+
+    def reconcile(self):
+        """Reconciliação de remoções na origem, tabela por tabela"""
+        print_header("RECONCILIANDO REMOÇÕES NA ORIGEM")
+
+        for entity, (table, key_columns, pet_column) in RECONCILE_TABLES.items():
+            if self.upstream_keys.get(entity) is None:
+                print_warning(f"{table}: busca na API incompleta - reconciliação ignorada")
+                continue
+            try:
+                self.stats[entity]['removed'] = self.reconcile_table(entity, table, key_columns, pet_column)
+            except psycopg2.Error as e:
+                self.rollback()
+                print_error(f"Erro ao reconciliar {table}: {e}")
+
     def show_summary(self):
         """Mostra resumo da importação"""
         print_header("RESUMO DA IMPORTAÇÃO")
@@ -516,31 +1315,69 @@ class VetCareImporter:
         total_errors = sum(s['errors'] for s in self.stats.values())
 
         for entity, stats in self.stats.items():
-            if stats['synced'] > 0 or stats['errors'] > 0:
+            if stats['synced'] > 0 or stats['errors'] > 0 or stats.get('unchanged') or stats['removed']:
+                unchanged = f", {stats['unchanged']:,} sem alteração" if stats.get('unchanged') else ''
+                removed = f", {stats['removed']:,} removidos na origem" if stats['removed'] else ''
                 print(f"  {entity.capitalize():15} - "
                       f"{Colors.OKGREEN}{stats['synced']:,} importados{Colors.ENDC}, "
-                      f"{Colors.FAIL if stats['errors'] > 0 else Colors.OKGREEN}{stats['errors']} erros{Colors.ENDC}")
+                      f"{Colors.FAIL if stats['errors'] > 0 else Colors.OKGREEN}{stats['errors']} erros{Colors.ENDC}"
+                      f"{unchanged}{removed}")
 
         print()
         print(f"{Colors.BOLD}Total: {total_synced:,} registros importados, {total_errors} erros{Colors.ENDC}")
 
-    def run(self):
-        """Executa importação completa"""
+        api = self.rate_limiter.snapshot()
+        p95 = f"{api['p95_latency']:.3f}s" if api['p95_latency'] is not None else 'n/a'
+        print()
+        print_info(f"API: {api['requests']:,} requisições, taxa final {api['rate']} req/s, "
+                   f"p95 {p95}, {api['throttled']} throttled (429/5xx), "
+                   f"{api['errors']} falhas de rede, {api['decreases']} reduções de taxa")
+
+        if self.cache:
+            print_info(f"Cache: {self.cache_stats['not_modified']:,} não modificados (304), "
+                       f"{self.cache_stats['same_hash']:,} com mesmo hash, "
+                       f"{self.cache_stats['changed']:,} alterados")
+
+    def run_imports(self):
+        """Executa todas as etapas de importação"""
+        self.import_customers()
+        self.import_pets()
+        self.import_vaccines()
+        self.import_grooming()
+        self.import_appointments()
+        if self.reconcile_deletes:
+            self.reconcile()  # Só reconcilia as entidades cuja listagem veio completa
+
+        if self.fetch_errors:
+            raise FetchError(f"Falha ao buscar {', '.join(self.fetch_errors)} na API")
+
+    def print_run_info(self):
+        print_info(f"API Base URL: {self.api_url}")
+        print_info(f"Rate limit: {self.rate_limiter.rate} req/s "
+                   f"(adaptativo, {self.rate_limiter.min_rate}-{self.rate_limiter.max_rate} req/s)")
+        print_info(f"Database: {self.db_config['database']} @ {self.db_config['host']}")
+        print()
+
+    def evict_cache(self):
+        if self.cache:
+            removed = self.cache.evict()
+            mode = 'ignorando entradas (--refresh-cache)' if self.refresh_cache else 'ativo'
+            print_info(f"Cache HTTP {mode}: {self.cache.path} ({removed} entradas expiradas removidas)")
+
+    def run(self) -> bool:
+        """Executa importação completa (retorna False se ela falhou)"""
         start_time = time.time()
 
         print_header("IMPORTAÇÃO COMPLETA DA API VETCARE")
-        print_info(f"API Base URL: {API_BASE_URL}")
-        print_info(f"Database: {DB_CONFIG['database']} @ {DB_CONFIG['host']}")
-        print()
+        self.print_run_info()
 
         self.connect_db()
+        self.evict_cache()
 
         try:
-            self.import_customers()
-            self.import_pets()
-            self.import_vaccines()
-            self.import_grooming()
-            self.import_appointments()
+            self.begin_batch()
+            self.run_imports()
+            self.finish_batch()
 
             elapsed = time.time() - start_time
             print()
@@ -548,14 +1385,384 @@ class VetCareImporter:
 
             self.show_summary()
 
+            if self.maintain:
+                from db_cleanup import run_maintenance
+                run_maintenance(self.conn, db_config=self.db_config, exit_on_error=False)
+
+            return True
+
+        except FetchError as e:
+            # O que foi importado já está commitado; o lote fecha como falho
+            print_error(str(e))
+            self.last_error = str(e)
+            self.abort_batch(e)
+            self.show_summary()
+            return False
+
         except Exception as e:
             print_error(f"Erro durante importação: {e}")
             import traceback
             traceback.print_exc()
-            self.conn.rollback()
+            self.last_error = str(e)
+            self.rollback()
+            self.abort_batch(e)
+            return False
+        finally:
+            self.close_db()
+
+    def check_reset(self):
+        """
+        Detecta clean/recreate/restore do banco entre ciclos do daemon (o lote do
+        ciclo anterior sumiu de import_batches). O índice em memória e o cache
+        não refletem mais o banco e são descartados.
+        """
+        if self.cache and self.cache.is_stale():
+            print_warning(f"Cache HTTP removido ou substituído - reabrindo {self.cache.path}")
+            self.cache.close()
+            self.cache = ResponseCache(**{**CACHE_CONFIG, 'path': self.cache.path})
+
+        if self.batch_id is None:
+            return
+
+        self.cursor.execute("SELECT to_regclass('import_batches') IS NOT NULL")
+        reset = not self.cursor.fetchone()[0]
+        if not reset:
+            self.cursor.execute("SELECT EXISTS (SELECT 1 FROM import_batches WHERE id = %s)", (self.batch_id,))
+            reset = not self.cursor.fetchone()[0]
+        self.conn.commit()
+
+        if reset:
+            print_warning(f"Lote #{self.batch_id} não existe mais no banco - descartando índice em memória e cache")
+            for hashes in self.record_hashes.values():
+                hashes.clear()
+            if self.cache:
+                self.cache.clear()
+
+    def run_cycle(self):
+        """Um ciclo do daemon, reaproveitando conexões e índices em memória"""
+        state = self.daemon_state
+        state['last_started'] = time.time()
+        state['cycles'] += 1
+        self.reset_stats()
+
+        print_header(f"CICLO {state['cycles']} - {datetime.now():%Y-%m-%d %H:%M:%S}")
+
+        try:
+            if self.conn is None or self.conn.closed:
+                self.connect_db(exit_on_error=False)
+            self.check_reset()
+            self.evict_cache()
+
+            self.begin_batch()
+            self.run_imports()
+            self.finish_batch()
+            self.show_summary()
+
+            if self.maintain:
+                from db_cleanup import run_maintenance
+                run_maintenance(self.conn, db_config=self.db_config, exit_on_error=False)
+
+            state['consecutive_failures'] = 0
+            state['last_error'] = None
+
+        except ImportInterrupted as e:
+            # Encerramento do daemon: o que já foi commitado fica, o lote fecha como interrompido
+            print_warning(f"Ciclo {state['cycles']} interrompido")
+            try:
+                self.rollback()
+            except psycopg2.Error:
+                pass
+            self.abort_batch(e)
+
+        except (Exception, SystemExit) as e:
+            # Inclui FetchError: API fora do ar conta como ciclo com falha no /health
+            print_error(f"Erro no ciclo {state['cycles']}: {e}")
+            state['failures'] += 1
+            state['consecutive_failures'] += 1
+            state['last_error'] = str(e)
+            try:
+                self.rollback()
+            except psycopg2.Error:
+                pass
+            self.abort_batch(e)
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) and self.conn:
+                self.conn.close()  # Reconecta no próximo ciclo
+
+        finally:
+            state['last_finished'] = time.time()
+            state['last_duration'] = state['last_finished'] - state['last_started']
+            print_info(f"Ciclo concluído em {state['last_duration']:.2f}s")
+
+    def metrics_text(self) -> str:
+        """Métricas no formato texto do Prometheus"""
+        state = self.daemon_state
+        api = self.rate_limiter.snapshot()
+        lines = [
+            f"vetcare_import_cycles_total {state['cycles']}",
+            f"vetcare_import_cycle_failures_total {state['failures']}",
+            f"vetcare_import_consecutive_failures {state['consecutive_failures']}",
+            f"vetcare_import_last_cycle_duration_seconds {state['last_duration'] or 0:.3f}",
+            f"vetcare_import_last_cycle_finished_timestamp {state['last_finished'] or 0:.0f}",
+            f"vetcare_import_api_rate {api['rate']}",
+            f"vetcare_import_api_requests_total {api['requests']}",
+            f"vetcare_import_api_throttled_total {api['throttled']}",
+            f"vetcare_import_api_errors_total {api['errors']}",
+        ]
+        for entity, stats in self.stats.items():
+            for key, value in stats.items():
+                lines.append(f'vetcare_import_records{{entity="{entity}",result="{key}"}} {value}')
+        for key, value in self.cache_stats.items():
+            lines.append(f'vetcare_import_cache_responses_total{{result="{key}"}} {value}')
+        for entity, count in self.change_counts.items():
+            lines.append(f'vetcare_import_changes{{entity="{entity}"}} {count}')
+        for entity, hashes in self.record_hashes.items():
+            lines.append(f'vetcare_import_indexed_records{{entity="{entity}"}} {len(hashes)}')
+        return '\n'.join(lines) + '\n'
+
+    def health(self) -> Tuple[int, Dict[str, Any]]:
+        """Status HTTP e corpo do /health"""
+        state = self.daemon_state
+        healthy = state['consecutive_failures'] == 0
+        return (200 if healthy else 503), {
+            'status': 'ok' if healthy else 'failing',
+            'rate': self.rate_limiter.rate,
+            **state,
+        }
+
+    def start_health_server(self, port: int) -> ThreadingHTTPServer:
+        """Endpoint local /health e /metrics em thread separada"""
+        importer = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    status, body = importer.health()
+                    payload, content_type = json.dumps(body).encode(), 'application/json'
+                elif self.path == '/metrics':
+                    status, payload, content_type = 200, importer.metrics_text().encode(), 'text/plain; version=0.0.4'
+                else:
+                    status, payload, content_type = 404, b'not found', 'text/plain'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Não poluir a saída do importador
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), HealthHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print_success(f"Health/metrics em http://127.0.0.1:{port}/health e /metrics")
+        return server
+
+    def run_daemon(self, interval: int, jitter: float, health_port: int):
+        """Fica residente executando ciclos a cada `interval` segundos (± jitter)"""
+        print_header("IMPORTADOR VETCARE - MODO DAEMON")
+        self.print_run_info()
+        print_info(f"Intervalo: {interval}s (jitter {jitter:.0%})")
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.stop_event.set())
+
+        server = self.start_health_server(health_port) if health_port else None
+
+        try:
+            while not self.stop_event.is_set():
+                self.run_cycle()
+                delay = max(interval * (1 + random.uniform(-jitter, jitter)), 1)
+                print_info(f"Próximo ciclo em {delay:.0f}s")
+                self.stop_event.wait(delay)
         finally:
+            print_info("Encerrando daemon...")
+            if server:
+                server.shutdown()
             self.close_db()
 
+def load_tenants(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Lê o arquivo JSON de clínicas. Valores no formato ${VAR} são expandidos
+    a partir do ambiente, para não gravar senhas e tokens no arquivo.
+    """
+    def expand(value):
+        if isinstance(value, str):
+            return os.path.expandvars(value)
+        if isinstance(value, dict):
+            return {key: expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        return value
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = expand(json.load(f))
+    except (OSError, ValueError) as e:
+        print_error(f"Erro ao ler {path}: {e}")
+        sys.exit(1)
+
+    tenants = [tenant for tenant in config.get('tenants', []) if tenant.get('enabled', True)]
+    names, targets = set(), {}
+    for tenant in tenants:
+        if not tenant.get('name') or not tenant.get('api_url'):
+            print_error(f"Clínica sem 'name' ou 'api_url' em {path}: {tenant}")
+            sys.exit(1)
+        if tenant['name'] in names:
+            print_error(f"Clínica duplicada em {path}: {tenant['name']}")
+            sys.exit(1)
+        names.add(tenant['name'])
+
+        # Duas clínicas no mesmo banco/schema sobrescreveriam os registros uma da
+        # outra (mesmos ids do VetCare) e a reconciliação removeria os da outra
+        db_config = tenant_db_config(tenant)
+        target = (db_config['host'], db_config['port'], db_config['database'], tenant.get('schema') or 'public')
+        if target in targets:
+            print_error(f"Clínicas {targets[target]} e {tenant['name']} usam o mesmo destino "
+                        f"({target[2]} @ {target[0]}:{target[1]}, schema {target[3]}) - "
+                        f"informe 'database' ou 'schema' diferentes")
+            sys.exit(1)
+        targets[target] = tenant['name']
+
+    if not tenants:
+        print_error(f"Nenhuma clínica habilitada em {path}")
+        sys.exit(1)
+
+    return tenants, config
+
+def tenant_db_config(tenant: Dict[str, Any]) -> Dict[str, Any]:
+    """DB_CONFIG com as chaves de `database` da clínica e o search_path do `schema`"""
+    db_config = {**DB_CONFIG, **tenant.get('database', {})}
+    if tenant.get('schema'):
+        db_config['options'] = f"-c search_path={tenant['schema']}"
+    return db_config
+
+def build_tenant_importer(tenant: Dict[str, Any], **options) -> VetCareImporter:
+    """Importador com API, banco/schema, rate limit e cache próprios da clínica"""
+    db_config = tenant_db_config(tenant)
+
+    cache_root, cache_ext = os.path.splitext(CACHE_CONFIG['path'])
+    return VetCareImporter(
+        api_url=tenant['api_url'].rstrip('/'),
+        db_config=db_config,
+        headers=tenant.get('headers'),
+        rate_limit=tenant.get('rate_limit'),
+        cache_path=tenant.get('cache_path', f"{cache_root}.{tenant['name']}{cache_ext}"),
+        name=tenant['name'],
+        **options,
+    )
+
+def run_tenants(path: str, max_concurrency: Optional[int] = None, **options) -> int:
+    """
+    Importa várias clínicas em paralelo, no máximo `max_concurrency` por vez.
+    Cada clínica tem conexão, sessão HTTP, rate limiter e cache próprios e
+    a falha de uma não interrompe as demais. Retorna o número de falhas.
+    """
+    tenants, config = load_tenants(path)
+    workers = max_concurrency or config.get('max_concurrency') or TENANTS_CONFIG['max_concurrency']
+    log_dir = config.get('log_dir', TENANTS_CONFIG['log_dir'])
+    os.makedirs(log_dir, exist_ok=True)
+
+    print_header("IMPORTAÇÃO MULTI-CLÍNICA")
+    print_info(f"{len(tenants)} clínicas em {path}, até {workers} simultâneas")
+    print_info(f"Logs por clínica em {log_dir}")
+    print()
+
+    stdout, stderr = TenantOutput(sys.stdout), TenantOutput(sys.stderr)
+
+    def run_tenant(tenant: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.time()
+        log_path = os.path.join(log_dir, f"{tenant['name']}.log")
+        importer, error = None, None
+
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            stdout.route(log_file)
+            stderr.route(log_file)
+            try:
+                importer = build_tenant_importer(tenant, **options)
+                if not importer.run():
+                    error = importer.last_error or 'erro durante a importação'
+            except (Exception, SystemExit) as e:
+                # SystemExit (ex.: connect_db); o motivo já está no log
+                error = str(e) if isinstance(e, Exception) else f'interrompida (código {e.code})'
+                print_error(f"Falha na clínica {tenant['name']}: {error}")
+                if importer:
+                    importer.close_db()
+            finally:
+                stdout.route(None)
+                stderr.route(None)
+
+        duration = time.time() - start
+        if error:
+            print_error(f"{tenant['name']}: {error} em {duration:.1f}s (ver {log_path})")
+        else:
+            print_success(f"{tenant['name']}: concluída em {duration:.1f}s")
+
+        return {
+            'name': tenant['name'],
+            'ok': error is None,
+            'error': error,
+            'duration': round(duration, 2),
+            'stats': importer.stats if importer else {},
+            'changes': importer.change_counts if importer else {},
+            'api': importer.rate_limiter.snapshot() if importer else {},
+            'log': log_path,
+        }
+
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_tenant, tenants))
+    finally:
+        sys.stdout, sys.stderr = stdout.stream, stderr.stream
+
+    print_header("RESUMO POR CLÍNICA")
+    for result in results:
+        stats = result['stats'].values()
+        synced = sum(s['synced'] for s in stats)
+        errors = sum(s['errors'] for s in stats)
+        removed = sum(s['removed'] for s in stats)
+        status = f"{Colors.OKGREEN}OK{Colors.ENDC}" if result['ok'] else f"{Colors.FAIL}FALHOU{Colors.ENDC}"
+        api = f", {result['api']['requests']:,} req a {result['api']['rate']} req/s" if result['api'] else ''
+        print(f"  {result['name']:20} {status:15} {result['duration']:8.1f}s  "
+              f"{synced:,} importados, {errors} erros, {removed:,} removidos na origem{api}")
+
+    summary_path = os.path.join(log_dir, 'summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({'finished_at': datetime.now().isoformat(), 'tenants': results}, f, indent=2, default=str)
+
+    failures = sum(1 for result in results if not result['ok'])
+    print()
+    if failures:
+        print_error(f"{failures} de {len(results)} clínicas falharam (resumo em {summary_path})")
+    else:
+        print_success(f"Todas as {len(results)} clínicas importadas (resumo em {summary_path})")
+    return failures
+
 if __name__ == '__main__':
-    importer = VetCareImporter()
-    importer.run()
+    options = {
+        'use_cache': '--no-cache' not in sys.argv,
+        'refresh_cache': '--refresh-cache' in sys.argv,
+        'maintain': '--maintain' in sys.argv,
+        'reconcile': '--no-reconcile' not in sys.argv,
+        'force_reconcile': '--force-reconcile' in sys.argv,
+    }
+
+    tenants_file = get_option('tenants')
+    if tenants_file:
+        if '--daemon' in sys.argv:
+            print_error("--daemon não suporta --tenants; agende uma execução por intervalo")
+            sys.exit(1)
+        max_concurrency = get_option('max-concurrency')
+        failures = run_tenants(tenants_file, int(max_concurrency) if max_concurrency else None, **options)
+        sys.exit(1 if failures else 0)
+
+    importer = VetCareImporter(**options)
+
+    if '--daemon' in sys.argv:
+        importer.run_daemon(
+            interval=int(get_option('interval', str(DAEMON_CONFIG['interval']))),
+            jitter=float(get_option('jitter', str(DAEMON_CONFIG['jitter']))),
+            health_port=int(get_option('health-port', str(DAEMON_CONFIG['health_port']))),
+        )
+    else:
+        if not importer.run():
+            sys.exit(1)
@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Query Plan Check
+Roda EXPLAIN (ANALYZE, BUFFERS) nas queries de produção do bot e compara com baselines
+"""
+
+import os
+import re
+import sys
+import json
+import statistics
+from datetime import datetime
+
+from db_cleanup import (
+    DB_CONFIG, Colors, get_connection, get_option,
+    print_header, print_success, print_warning, print_error, print_info,
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_baselines.json')
+
+# Queries quentes do bot (src/modules e src/routes/dashboard.ts).
+# O SQL é uma cópia manual das queries do TypeScript: ao alterar uma query lá,
+# atualize a entrada correspondente aqui (e rode 'baseline' de novo).
+# params_sql busca parâmetros reais no banco; params é o fallback quando não há dados.
+# suggestions são índices curados à mão para cada query; o 'check' também
+# deriva candidatos das colunas filtradas nos seq scans do plano.
+QUERIES = {
+    'vaccine_reactivation': {
+        'source': 'src/modules/vaccines/vaccineReactivation.ts',
+        'sql': """
+            SELECT v.id, v.pet_id, v.vaccine_name, v.application_date, v.next_dose_date,
+                   v.is_annual, p.name AS pet_name, c.name AS customer_name, c.phone AS customer_phone
+            FROM vaccines v
+            INNER JOIN pets p ON v.pet_id = p.id
+            INNER JOIN customers c ON p.customer_id = c.id
+            WHERE c.phone IS NOT NULL AND c.phone != ''
+              AND v.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+              AND c.removed_upstream_at IS NULL
+            ORDER BY v.application_date DESC
+        """,
+        'suggestions': [
+            "CREATE INDEX idx_vaccines_next_dose_pending ON vaccines (next_dose_date, pet_id) "
+            "WHERE next_dose_date IS NOT NULL  -- filtrar no SQL em vez de no Node",
+        ],
+    },
+    'vaccine_sent_today': {
+        'source': 'vaccineReactivation.wasReactivationSentToday',
+        'sql': """
+            SELECT COUNT(*) AS count FROM reactivation_logs
+            WHERE customer_id = %s
+              AND reactivation_type = 'vaccine'
+              AND (message_sent->>'vaccineId')::INTEGER = %s
+              AND DATE(sent_at) = CURRENT_DATE
+        """,
+        'params_sql': """
+            SELECT customer_id, (message_sent->>'vaccineId')::INTEGER FROM reactivation_logs
+            WHERE reactivation_type = 'vaccine' AND message_sent ? 'vaccineId'
+            ORDER BY sent_at DESC LIMIT 1
+        """,
+        'params': (1, 1),
+        'suggestions': [
+            "CREATE INDEX idx_reactivation_logs_customer_type_day ON reactivation_logs "
+            "(customer_id, reactivation_type, (DATE(sent_at)))",
+            "CREATE INDEX idx_reactivation_logs_vaccine_id ON reactivation_logs "
+            "(((message_sent->>'vaccineId')::INTEGER)) WHERE reactivation_type = 'vaccine'",
+        ],
+    },
+    'grooming_reactivation': {
+        'source': 'src/modules/grooming/groomingReactivation.ts',
+        'sql': """
+            SELECT gs.id, gs.pet_id, gs.service_date, gs.service_type, gs.has_plan, gs.plan_type,
+                   p.name AS pet_name, p.breed AS pet_breed, c.id AS customer_id,
+                   c.name AS customer_name, c.phone AS customer_phone
+            FROM grooming_services gs
+            INNER JOIN pets p ON gs.pet_id = p.id
+            INNER JOIN customers c ON p.customer_id = c.id
+            WHERE c.phone IS NOT NULL AND c.phone != ''
+              AND gs.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+              AND c.removed_upstream_at IS NULL
+            ORDER BY gs.service_date DESC
+        """,
+        'suggestions': [],
+    },
+    'grooming_sent_recently': {
+        'source': 'groomingReactivation.wasReactivationSentRecently',
+        'sql': """
+            SELECT COUNT(*) AS count FROM reactivation_logs
+            WHERE customer_id = %s
+              AND reactivation_type = 'grooming'
+              AND (message_sent->>'serviceId')::INTEGER = %s
+              AND sent_at >= NOW() - (%s || ' days')::INTERVAL
+        """,
+        'params_sql': """
+            SELECT customer_id, (message_sent->>'serviceId')::INTEGER, '7' FROM reactivation_logs
+            WHERE reactivation_type = 'grooming' AND message_sent ? 'serviceId'
+            ORDER BY sent_at DESC LIMIT 1
+        """,
+        'params': (1, 1, '7'),
+        'suggestions': [
+            "CREATE INDEX idx_reactivation_logs_customer_type_sent ON reactivation_logs "
+            "(customer_id, reactivation_type, sent_at)",
+        ],
+    },
+    'appointment_confirmation': {
+        'source': 'src/modules/appointments/appointmentConfirmation.ts',
+        'sql': """
+            SELECT a.id, a.pet_id, a.appointment_date, a.appointment_type,
+                   p.name AS pet_name, c.name AS customer_name, c.phone AS customer_phone
+            FROM appointments a
+            INNER JOIN pets p ON a.pet_id = p.id
+            INNER JOIN customers c ON p.customer_id = c.id
+            WHERE a.status = 'agendado'
+              AND DATE(a.appointment_date) = CURRENT_DATE + INTERVAL '1 day'
+              AND c.phone IS NOT NULL AND c.phone != ''
+              AND a.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+              AND c.removed_upstream_at IS NULL
+        """,
+        'suggestions': [
+            "CREATE INDEX idx_appointments_status_day ON appointments "
+            "(status, (DATE(appointment_date)))",
+        ],
+    },
+    'dashboard_messages_today': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': "SELECT COUNT(*) AS count FROM reactivation_logs WHERE DATE(sent_at) = CURRENT_DATE",
+        'suggestions': [
+            "CREATE INDEX idx_reactivation_logs_sent_day ON reactivation_logs ((DATE(sent_at)))",
+        ],
+    },
+    'dashboard_messages_week': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': """
+            SELECT COUNT(*) AS count FROM reactivation_logs
+            WHERE sent_at >= CURRENT_DATE - INTERVAL '7 days'
+        """,
+        'suggestions': [],
+    },
+    'dashboard_status_today': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': """
+            SELECT status, COUNT(*) AS count FROM reactivation_logs
+            WHERE DATE(sent_at) = CURRENT_DATE
+            GROUP BY status
+        """,
+        'suggestions': [
+            "CREATE INDEX idx_reactivation_logs_day_status ON reactivation_logs "
+            "((DATE(sent_at)), status)",
+        ],
+    },
+    'dashboard_by_type_today': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': """
+            SELECT reactivation_type, COUNT(*) AS count FROM reactivation_logs
+            WHERE DATE(sent_at) = CURRENT_DATE
+            GROUP BY reactivation_type
+            ORDER BY count DESC
+        """,
+        'suggestions': [
+            "CREATE INDEX idx_reactivation_logs_day_type ON reactivation_logs "
+            "((DATE(sent_at)), reactivation_type)",
+        ],
+    },
+    'dashboard_upcoming_vaccines': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': """
+            SELECT COUNT(*) AS count FROM vaccines v
+            INNER JOIN pets p ON v.pet_id = p.id
+            INNER JOIN customers c ON p.customer_id = c.id
+            WHERE v.next_dose_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '30 days'
+              AND v.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+              AND c.removed_upstream_at IS NULL
+        """,
+        'suggestions': [],
+    },
+    'dashboard_upcoming_appointments': {
+        'source': 'src/routes/dashboard.ts /stats',
+        'sql': """
+            SELECT COUNT(*) AS count FROM appointments a
+            INNER JOIN pets p ON a.pet_id = p.id
+            INNER JOIN customers c ON p.customer_id = c.id
+            WHERE a.appointment_date BETWEEN NOW() AND NOW() + INTERVAL '7 days'
+              AND a.status IN ('agendado', 'confirmado')
+              AND a.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+              AND c.removed_upstream_at IS NULL
+        """,
+        'suggestions': [
+            "CREATE INDEX idx_appointments_date_open ON appointments (appointment_date) "
+            "WHERE status IN ('agendado', 'confirmado')",
+        ],
+    },
+    'dashboard_recent_messages': {
+        'source': 'src/routes/dashboard.ts /recent-messages',
+        'sql': """
+            SELECT rl.id, rl.customer_id, rl.reactivation_type, rl.message_sent, rl.sent_at,
+                   rl.status, rl.error_message, c.name AS customer_name, c.phone AS customer_phone
+            FROM reactivation_logs rl
+            INNER JOIN customers c ON rl.customer_id = c.id
+            ORDER BY rl.sent_at DESC
+            LIMIT 50
+        """,
+        'suggestions': [],
+    },
+    'dashboard_stats_by_day': {
+        'source': 'src/routes/dashboard.ts /stats-by-day',
+        'sql': """
+            SELECT day AS date, reactivation_type AS type, SUM(total) AS count,
+                   SUM(CASE WHEN status = 'success' THEN total ELSE 0 END) AS success
+            FROM dashboard_daily_messages
+            WHERE day >= CURRENT_DATE - INTERVAL '7 days' AND day < CURRENT_DATE
+            GROUP BY day, reactivation_type
+            UNION ALL
+            SELECT CURRENT_DATE AS date, reactivation_type::TEXT AS type, COUNT(*) AS count,
+                   COUNT(*) FILTER (WHERE status = 'success') AS success
+            FROM reactivation_logs
+            WHERE DATE(sent_at) = CURRENT_DATE
+            GROUP BY reactivation_type
+            ORDER BY date DESC, type
+        """,
+        'suggestions': [],
+    },
+    'dashboard_top_customers': {
+        'source': 'src/routes/dashboard.ts /top-customers',
+        'sql': """
+            SELECT t.customer_id, c.name AS customer_name, c.phone AS customer_phone,
+                   t.total_messages, t.last_message
+            FROM dashboard_customer_totals t
+            INNER JOIN customers c ON t.customer_id = c.id
+            ORDER BY t.total_messages DESC
+            LIMIT 10
+        """,
+        'suggestions': [],
+    },
+}
+
+def resolve_params(cursor, query):
+    """Busca parâmetros reais para a query (ou usa o fallback)"""
+    if 'params_sql' in query:
+        try:
+            cursor.execute(query['params_sql'])
+            row = cursor.fetchone()
+            if row:
+                return tuple(row)
+        except Exception:
+            cursor.connection.rollback()
+    return query.get('params', ())
+
+def walk_plan(node):
+    """Itera sobre todos os nós do plano"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
+
+def get_table_sizes(cursor):
+    """Número estimado de linhas por tabela (pg_class.reltuples)"""
+    cursor.execute("""
+        SELECT c.relname, c.reltuples::BIGINT
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+    """)
+    return dict(cursor.fetchall())
+
+SUGGESTION_PATTERN = re.compile(r'CREATE INDEX (\w+) ON (\w+)\s*(.*)', re.IGNORECASE | re.DOTALL)
+
+def index_key(definition):
+    """Normaliza colunas/expressões e predicado de um índice para comparação"""
+    return re.sub(r'[\s()]', '', definition).lower()
+
+def get_existing_indexes(cursor):
+    """Nomes dos índices do schema atual e {(tabela, definição normalizada): nome}"""
+    cursor.execute("""
+        SELECT tablename, indexname, indexdef
+        FROM pg_indexes
+        WHERE schemaname = current_schema()
+    """)
+    names = set()
+    keys = {}
+    for table, name, definition in cursor.fetchall():
+        names.add(name)
+        match = re.search(r' USING \w+ (.*)$', definition)
+        if match:
+            keys[(table, index_key(match.group(1)))] = name
+    return names, keys
+
+def split_suggestions(query, existing):
+    """Separa as sugestões em (pendentes, índices que já existem)"""
+    names, keys = existing
+    pending, present = [], []
+    for suggestion in query['suggestions']:
+        match = SUGGESTION_PATTERN.match(suggestion.split('--')[0].strip())
+        if not match:
+            pending.append(suggestion)
+        elif match.group(1) in names:
+            present.append(match.group(1))
+        elif (match.group(2), index_key(match.group(3))) in keys:
+            present.append(keys[(match.group(2), index_key(match.group(3)))])
+        else:
+            pending.append(suggestion)
+    return pending, present
+
+def get_schema_columns(cursor):
+    """
+    Colunas por tabela do schema atual e {partição: tabela pai}, para que
+    sugestões vindas de seq scans em partições apontem para a tabela particionada
+    """
+    cursor.execute("""
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        ORDER BY table_name, ordinal_position
+    """)
+    columns = {}
+    for table, column in cursor.fetchall():
+        columns.setdefault(table, []).append(column)
+
+    cursor.execute("""
+        SELECT c.relname, p.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = current_schema()
+    """)
+    return columns, dict(cursor.fetchall())
+
+def plan_suggestions(seq_scans, schema_columns, existing):
+    """
+    Índices candidatos derivados do plano: colunas da tabela citadas no Filter de
+    cada seq scan, na ordem em que aparecem. Ignora tabelas que já têm um índice
+    começando pela primeira dessas colunas.
+    """
+    columns, parents = schema_columns
+    _, keys = existing
+    suggestions = []
+    for scan in seq_scans:
+        if not scan['filter']:
+            continue
+        relation = parents.get(scan['relation'], scan['relation'])
+        table_columns = set(columns.get(relation, []))
+        text = re.sub(r"'[^']*'", '', scan['filter'])  # literais não são colunas
+        used = [token for token in dict.fromkeys(re.findall(r'[a-z_][a-z0-9_]*', text))
+                if token in table_columns]
+        if not used:
+            continue
+        if any(table == relation and key.startswith(used[0]) for table, key in keys):
+            continue
+        suggestions.append(f"CREATE INDEX ON {relation} ({', '.join(used)})  -- colunas do filtro do seq scan")
+    return list(dict.fromkeys(suggestions))
+
+def explain_query(conn, query, runs):
+    """Executa EXPLAIN (ANALYZE, BUFFERS) e retorna tempo mediano, buffers e seq scans"""
+    cursor = conn.cursor()
+    params = resolve_params(cursor, query)
+    table_sizes = get_table_sizes(cursor)
+    min_rows = int(get_option('min-rows', '1000'))
+
+    timings = []
+    plan = None
+    try:
+        for _ in range(runs):
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query['sql'], params)
+            result = cursor.fetchone()[0]
+            result = json.loads(result) if isinstance(result, str) else result
+            plan = result[0]
+            timings.append(plan['Execution Time'])
+    finally:
+        conn.rollback()  # EXPLAIN ANALYZE executa a query de verdade
+        cursor.close()
+
+    root = plan['Plan']
+    seq_scans = []
+    for node in walk_plan(root):
+        if node.get('Node Type') != 'Seq Scan':
+            continue
+        relation = node.get('Relation Name')
+        if table_sizes.get(relation, 0) < min_rows:
+            continue  # Seq scan em tabela pequena é o plano correto
+        seq_scans.append({
+            'relation': relation,
+            'filter': node.get('Filter'),
+            'rows_removed': node.get('Rows Removed by Filter', 0),
+        })
+
+    return {
+        'execution_ms': round(statistics.median(timings), 3),
+        'planning_ms': round(plan.get('Planning Time', 0), 3),
+        'shared_hit': root.get('Shared Hit Blocks', 0),
+        'shared_read': root.get('Shared Read Blocks', 0),
+        'seq_scans': seq_scans,
+    }
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baselines(path, results):
+    data = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database': DB_CONFIG['database'],
+        'queries': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def select_queries():
+    """Filtra queries pelo --only=nome1,nome2"""
+    only = get_option('only')
+    if not only:
+        return QUERIES
+    names = [name.strip() for name in only.split(',')]
+    unknown = [name for name in names if name not in QUERIES]
+    if unknown:
+        print_error(f"Queries desconhecidas: {', '.join(unknown)}")
+        sys.exit(1)
+    return {name: QUERIES[name] for name in names}
+
+def run_explain_all(conn, runs):
+    """Executa EXPLAIN em todas as queries selecionadas"""
+    results = {}
+    for name, query in select_queries().items():
+        try:
+            results[name] = explain_query(conn, query, runs)
+        except Exception as e:
+            print_error(f"{name}: erro ao executar EXPLAIN - {e}")
+    return results
+
+def check_plans(conn, baseline_path, runs, factor, min_delta_ms):
+    """Compara os planos atuais com os baselines e retorna o número de problemas"""
+    print_header("VERIFICAÇÃO DE PLANOS DE EXECUÇÃO")
+
+    baselines = load_baselines(baseline_path).get('queries', {})
+    if not baselines:
+        print_warning(f"Nenhum baseline em {baseline_path} - rode o comando 'baseline' primeiro")
+        print_info("Verificando apenas seq scans")
+    print()
+
+    results = run_explain_all(conn, runs)
+    problems = 0
+
+    cursor = conn.cursor()
+    existing = get_existing_indexes(cursor)
+    schema_columns = get_schema_columns(cursor)
+    conn.rollback()
+    cursor.close()
+
+    for name, current in results.items():
+        query = QUERIES[name]
+        base = baselines.get(name)
+        issues = []
+
+        if base:
+            limit = max(base['execution_ms'] * factor, base['execution_ms'] + min_delta_ms)
+            if current['execution_ms'] > limit:
+                issues.append(f"regressão de tempo: {base['execution_ms']:.2f}ms -> {current['execution_ms']:.2f}ms")
+
+            known = {scan['relation'] for scan in base.get('seq_scans', [])}
+            for scan in current['seq_scans']:
+                if scan['relation'] not in known:
+                    issues.append(f"novo seq scan em {scan['relation']}")
+
+        for scan in current['seq_scans']:
+            detail = f" (filtro: {scan['filter']}, {scan['rows_removed']:,} linhas descartadas)" if scan['filter'] else ''
+            issues.append(f"seq scan em {scan['relation']}{detail}")
+
+        status = f"{current['execution_ms']:9.2f}ms  buffers hit={current['shared_hit']:,} read={current['shared_read']:,}"
+        if not issues:
+            print_success(f"{name:34} {status}")
+            continue
+
+        problems += 1
+        print_warning(f"{name:34} {status}")
+        print(f"      origem: {query['source']}")
+        for issue in dict.fromkeys(issues):
+            print(f"      {Colors.WARNING}- {issue}{Colors.ENDC}")
+        pending, present = split_suggestions(query, existing)
+        for suggestion in pending:
+            print(f"      {Colors.OKCYAN}sugestão: {suggestion}{Colors.ENDC}")
+        for index_name in present:
+            print(f"      {Colors.OKCYAN}índice {index_name} já existe, mas o plano não o usa{Colors.ENDC}")
+        for suggestion in plan_suggestions(current['seq_scans'], schema_columns, existing):
+            print(f"      {Colors.OKCYAN}candidato do plano: {suggestion}{Colors.ENDC}")
+
+    print()
+    if problems:
+        print_warning(f"{problems} de {len(results)} queries com problemas")
+    else:
+        print_success(f"Todas as {len(results)} queries dentro do baseline")
+    return problems
+
+def record_baselines(conn, baseline_path, runs):
+    """Grava os planos atuais como baseline"""
+    print_header("GRAVANDO BASELINES")
+
+    results = run_explain_all(conn, runs)
+    for name, current in results.items():
+        scans = ', '.join(scan['relation'] for scan in current['seq_scans']) or 'nenhum seq scan'
+        print_success(f"{name:34} {current['execution_ms']:9.2f}ms  ({scans})")
+
+    save_baselines(baseline_path, results)
+    print()
+    print_success(f"Baselines gravados em {baseline_path}")
+
+def main():
+    """Função principal"""
+    print_header("QUERY PLAN CHECK")
+    print_info(f"Database: {DB_CONFIG['database']} @ {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    print()
+
+    if len(sys.argv) < 2:
+        print(f"{Colors.BOLD}Uso:{Colors.ENDC}")
+        print(f"  python {sys.argv[0]} <comando> [opções]")
+        print()
+        print(f"{Colors.BOLD}Comandos disponíveis:{Colors.ENDC}")
+        print(f"  list               - Lista as queries registradas")
+        print(f"  check              - Compara planos atuais com os baselines")
+        print(f"  baseline           - Grava os planos atuais como baseline")
+        print()
+        print(f"{Colors.BOLD}Opções:{Colors.ENDC}")
+        print(f"  --only=q1,q2       - Apenas as queries informadas")
+        print(f"  --runs=3           - Execuções por query (usa a mediana)")
+        print(f"  --factor=1.5       - Fator de regressão de tempo")
+        print(f"  --min-delta=5      - Diferença mínima em ms para regressão")
+        print(f"  --min-rows=1000    - Ignora seq scans em tabelas menores")
+        print(f"  --file=PATH        - Arquivo de baselines")
+        print()
+        sys.exit(1)
+
+    command = sys.argv[1]
+    baseline_path = get_option('file', BASELINE_FILE)
+    runs = int(get_option('runs', '3'))
+
+    if command == 'list':
+        for name, query in QUERIES.items():
+            print(f"  {name:34} {query['source']}")
+        return
+
+    conn = get_connection()
+
+    try:
+        if command == 'check':
+            problems = check_plans(
+                conn, baseline_path, runs,
+                factor=float(get_option('factor', '1.5')),
+                min_delta_ms=float(get_option('min-delta', '5')),
+            )
+            if problems:
+                sys.exit(2)
+
+        elif command == 'baseline':
+            record_baselines(conn, baseline_path, runs)
+
+        else:
+            print_error(f"Comando desconhecido: {command}")
+            sys.exit(1)
+
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
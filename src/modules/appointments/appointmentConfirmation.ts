@@ -27,6 +27,9 @@ export class AppointmentConfirmation {
         AND DATE(a.appointment_date) = CURRENT_DATE + INTERVAL '1 day'
         AND c.phone IS NOT NULL
         AND c.phone != ''
+        AND a.removed_upstream_at IS NULL
+        AND p.removed_upstream_at IS NULL
+        AND c.removed_upstream_at IS NULL
       ORDER BY a.appointment_date ASC
     `;
 
@@ -52,6 +55,7 @@ export class AppointmentConfirmation {
         AND a.id != $2
         AND a.appointment_date > NOW()
         AND a.status IN ('agendado', 'confirmado')
+        AND a.removed_upstream_at IS NULL
         AND (a.appointment_type = 'retorno' OR a.appointment_type = 'consulta')
     `;
 
@@ -26,6 +26,7 @@ export class FinancialReactivation {
         AND fd.service_date < CURRENT_DATE
         AND c.phone IS NOT NULL
         AND c.phone != ''
+        AND c.removed_upstream_at IS NULL
       ORDER BY fd.service_date ASC
     `;
 
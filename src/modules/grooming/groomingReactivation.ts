@@ -28,6 +28,9 @@ export class GroomingReactivation {
       INNER JOIN customers c ON p.customer_id = c.id
       WHERE c.phone IS NOT NULL
         AND c.phone != ''
+        AND gs.removed_upstream_at IS NULL
+        AND p.removed_upstream_at IS NULL
+        AND c.removed_upstream_at IS NULL
       ORDER BY gs.service_date DESC
     `;
 
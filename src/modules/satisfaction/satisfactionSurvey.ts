@@ -31,6 +31,8 @@ export class SatisfactionSurvey {
         AND cs.service_date <= NOW()
         AND c.phone IS NOT NULL
         AND c.phone != ''
+        AND p.removed_upstream_at IS NULL
+        AND c.removed_upstream_at IS NULL
       ORDER BY cs.service_date ASC
     `;
 
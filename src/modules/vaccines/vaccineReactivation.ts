@@ -25,6 +25,9 @@ export class VaccineReactivation {
       INNER JOIN customers c ON p.customer_id = c.id
       WHERE c.phone IS NOT NULL
         AND c.phone != ''
+        AND v.removed_upstream_at IS NULL
+        AND p.removed_upstream_at IS NULL
+        AND c.removed_upstream_at IS NULL
       ORDER BY v.application_date DESC
     `;
 
@@ -9,14 +9,14 @@ const router = Router();
  */
 router.get('/stats', async (req: Request, res: Response) => {
   try {
-    // Total de clientes
+    // Total de clientes (sem os removidos no VetCare)
     const [{ count: total_customers }] = await database.query<{ count: string }>(
-      'SELECT COUNT(*) as count FROM customers'
+      'SELECT COUNT(*) as count FROM customers WHERE removed_upstream_at IS NULL'
     );
 
-    // Total de pets
+    // Total de pets (sem os removidos no VetCare)
     const [{ count: total_pets }] = await database.query<{ count: string }>(
-      'SELECT COUNT(*) as count FROM pets'
+      'SELECT COUNT(*) as count FROM pets WHERE removed_upstream_at IS NULL'
     );
 
     // Mensagens enviadas hoje
@@ -53,8 +53,12 @@ router.get('/stats', async (req: Request, res: Response) => {
 
     // Próximas vacinas (próximos 30 dias)
     const [{ count: upcoming_vaccines }] = await database.query<{ count: string }>(
-      `SELECT COUNT(*) as count FROM vaccines
-       WHERE next_dose_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '30 days'`
+      `SELECT COUNT(*) as count FROM vaccines v
+       INNER JOIN pets p ON v.pet_id = p.id
+       INNER JOIN customers c ON p.customer_id = c.id
+       WHERE v.next_dose_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '30 days'
+       AND v.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+       AND c.removed_upstream_at IS NULL`
     );
 
     // Débitos em aberto
@@ -65,9 +69,13 @@ router.get('/stats', async (req: Request, res: Response) => {
 
     // Consultas agendadas (próximos 7 dias)
     const [{ count: upcoming_appointments }] = await database.query<{ count: string }>(
-      `SELECT COUNT(*) as count FROM appointments
-       WHERE appointment_date BETWEEN NOW() AND NOW() + INTERVAL '7 days'
-       AND status IN ('agendado', 'confirmado')`
+      `SELECT COUNT(*) as count FROM appointments a
+       INNER JOIN pets p ON a.pet_id = p.id
+       INNER JOIN customers c ON p.customer_id = c.id
+       WHERE a.appointment_date BETWEEN NOW() AND NOW() + INTERVAL '7 days'
+       AND a.status IN ('agendado', 'confirmado')
+       AND a.removed_upstream_at IS NULL AND p.removed_upstream_at IS NULL
+       AND c.removed_upstream_at IS NULL`
     );
 
     res.json({
@@ -156,6 +164,8 @@ router.get('/recent-messages', async (req: Request, res: Response) => {
 
 /**
  * Estatísticas por período (últimos 7 dias)
+ * Dias anteriores vêm dos agregados mantidos por scripts/dashboard_rollup.py;
+ * o dia de hoje é agregado ao vivo, igual aos contadores de /stats
  */
 router.get('/stats-by-day', async (req: Request, res: Response) => {
   try {
@@ -168,13 +178,23 @@ router.get('/stats-by-day', async (req: Request, res: Response) => {
       success: string;
     }>(
       `SELECT
-        DATE(sent_at) as date,
+        day as date,
         reactivation_type as type,
+        SUM(total) as count,
+        SUM(CASE WHEN status = 'success' THEN total ELSE 0 END) as success
+      FROM dashboard_daily_messages
+      WHERE day >= CURRENT_DATE - INTERVAL '${days} days'
+        AND day < CURRENT_DATE
+      GROUP BY day, reactivation_type
+      UNION ALL
+      SELECT
+        CURRENT_DATE as date,
+        reactivation_type::TEXT as type,
         COUNT(*) as count,
-        SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success
+        COUNT(*) FILTER (WHERE status = 'success') as success
       FROM reactivation_logs
-      WHERE sent_at >= CURRENT_DATE - INTERVAL '${days} days'
-      GROUP BY DATE(sent_at), reactivation_type
+      WHERE DATE(sent_at) = CURRENT_DATE
+      GROUP BY reactivation_type
       ORDER BY date DESC, type`
     );
 
@@ -196,6 +216,7 @@ router.get('/stats-by-day', async (req: Request, res: Response) => {
 
 /**
  * Top clientes com mais reativações
+ * Lê o ranking mantido por scripts/dashboard_rollup.py
  */
 router.get('/top-customers', async (req: Request, res: Response) => {
   try {
@@ -209,15 +230,14 @@ router.get('/top-customers', async (req: Request, res: Response) => {
       last_message: Date;
     }>(
       `SELECT
-        rl.customer_id,
+        t.customer_id,
         c.name as customer_name,
         c.phone as customer_phone,
-        COUNT(*) as total_messages,
-        MAX(rl.sent_at) as last_message
-      FROM reactivation_logs rl
-      INNER JOIN customers c ON rl.customer_id = c.id
-      GROUP BY rl.customer_id, c.name, c.phone
-      ORDER BY total_messages DESC
+        t.total_messages,
+        t.last_message
+      FROM dashboard_customer_totals t
+      INNER JOIN customers c ON t.customer_id = c.id
+      ORDER BY t.total_messages DESC
       LIMIT $1`,
       [limit]
     );